@@ -0,0 +1,384 @@
+import os
+import sys
+import sqlite3
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+from time import perf_counter
+from pathlib import Path
+
+# For string distances
+import distances
+# Database loading
+from engine import Engine
+
+# Names close to the one found in a bibliography, variants are built from them
+LAST_NAMES = ['Benítez', 'Chollet', 'Sparks', 'Smith', 'Dupont', 'Müller',
+              'Nougaret', 'García', 'Martin', 'Kowalski', 'Nguyen', 'Schmidt',
+              'Rossi', 'Leroy', 'Van der Berg', "O'Connor", 'Dubois',
+              'Fernández', 'Takahashi', 'Andersson', 'Papadopoulos',
+              'Wiśniewski', 'Rodríguez-López', 'Johansson', 'Lefèvre']
+
+FIRST_NAMES = ['M. Carmen', 'François', 'Robert Stephen John', 'R. S. J.',
+               'Matthieu', 'Anna', 'Jean-Luc', 'Hans', 'Wei', 'Lucía',
+               'Pierre', 'Maria Teresa', 'Yuki', 'Lars Erik', 'Dimitrios',
+               'Agnieszka', 'Sean', 'Camille', 'Ana Isabel', 'Björn']
+
+def name_variant(name:str, rng:np.random.Generator) -> str:
+    """
+    Function to build a plausible variant of a name: typo, transposition,
+    missing or added letter, or the same name.
+
+    Parameters
+    ----------
+    name : str
+        Original name.
+    rng : np.random.Generator
+        Random generator.
+
+    Returns
+    -------
+    str
+        Name variant.
+
+    """
+    chars = list(name)
+    kind = rng.integers(0, 5)
+    pos = int(rng.integers(0, len(chars)))
+    if kind == 0:
+        chars[pos] = chr(ord('a')+int(rng.integers(0, 26)))
+    elif (kind == 1) and (pos < len(chars)-1):
+        chars[pos], chars[pos+1] = chars[pos+1], chars[pos]
+    elif (kind == 2) and (len(chars) > 1):
+        del chars[pos]
+    elif kind == 3:
+        chars.insert(pos, chr(ord('a')+int(rng.integers(0, 26))))
+
+    return ''.join(chars)
+
+def name_pairs(num:int, seed:int=0) -> list:
+    """
+    Function to generate reduced (no space and dot) name pairs, half of
+    them being variants of the same name and the other half random pairs.
+
+    Parameters
+    ----------
+    num : int
+        Number of pairs.
+    seed : int, optional
+        Random generator seed. The default is 0.
+
+    Returns
+    -------
+    pairs : list
+        List of tuples of two strings.
+
+    """
+    rng = np.random.default_rng(seed)
+    names = LAST_NAMES + FIRST_NAMES
+    pairs = []
+    for i in range(num):
+        name = names[int(rng.integers(0, len(names)))]
+        if i % 2:
+            other = name_variant(name, rng)
+        else:
+            other = names[int(rng.integers(0, len(names)))]
+
+        pairs.append((name.replace(' ', '').replace('.', ''),
+                      other.replace(' ', '').replace('.', '')))
+
+    return pairs
+
+def best_time(function, repeat:int) -> float:
+    """
+    Function to get the best run time of a function.
+
+    Parameters
+    ----------
+    function : callable
+        Function to time, called without arguments.
+    repeat : int
+        Number of runs.
+
+    Returns
+    -------
+    float
+        Minimum run time in seconds.
+
+    """
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        times.append(perf_counter()-start)
+
+    return min(times)
+
+def bench_distances(num:int, treshold:float, repeat:int) -> None:
+    """
+    Benchmark of the distance functions: float distances allocating their
+    rows at each call, integer distances on a reused workspace and the
+    batched (parallel) version.
+
+    Parameters
+    ----------
+    num : int
+        Number of name pairs.
+    treshold : float
+        Treshold used by the early stoping.
+    repeat : int
+        Number of runs, the best one is kept.
+
+    """
+    pairs = name_pairs(num)
+    # characters code, as the names given by the engine
+    to_codes = lambda name: np.frombuffer(name.encode('utf-32-le'),
+                                          dtype=np.uint32).copy()
+
+    arr_pairs = [(to_codes(a), to_codes(b)) for a, b in pairs]
+
+    # names as concatenated codes for the batched version
+    names = [a for a, _ in pairs]+[b for _, b in pairs]
+    offsets = np.zeros(len(names)+1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(n) for n in names])
+    codes = to_codes(''.join(names))
+    idx_1 = np.arange(num) ; idx_2 = np.arange(num)+num
+
+    max_len = max(len(n) for n in names)
+    work = np.zeros((3, max_len+1), dtype=np.int32)
+    tests = {
+        'Levenshtein': [
+            ('float, allocated rows',
+             lambda a, b: distances.Levenshtein_distance(a, b)),
+            ('float, allocated rows, early stoping',
+             lambda a, b: distances.Levenshtein_distance_es(a, b, treshold)),
+            ('int32, reused workspace, early stoping',
+             lambda a, b: distances.Levenshtein_distance_ws(a, b, treshold,
+                                                            work))],
+        'Damerau-Levenshtein': [
+            ('float, allocated rows',
+             lambda a, b: distances.Damerau_Levenshtein_distance(a, b)),
+            ('float, allocated rows, early stoping',
+             lambda a, b: distances.Damerau_Levenshtein_distance_es(
+                 a, b, treshold)),
+            ('int32, reused workspace, early stoping',
+             lambda a, b: distances.Damerau_Levenshtein_distance_ws(
+                 a, b, treshold, work))]}
+
+    print(f'{num} name pairs, treshold {treshold}')
+    for damerau, algo in enumerate(tests):
+        print(algo)
+        for label, f_dist in tests[algo]:
+            # first call for the compilation
+            f_dist(*arr_pairs[0])
+            t = best_time(lambda: [f_dist(a, b) for a, b in arr_pairs],
+                          repeat)
+
+            print(f'    {label:<42} {t/num*1e6:8.3f} us/pair')
+
+        expected = np.array([tests[algo][2][1](a, b) for a, b in arr_pairs])
+        batch = lambda: distances.Batch_distances(
+            codes, offsets, idx_1, idx_2, treshold, bool(damerau), 1024)
+
+        if not np.array_equal(batch(), expected):
+            print('    batched version gives different distances !')
+
+        t = best_time(batch, repeat)
+        print(f'    {"int32, batched, parallel chunks":<42} '
+              f'{t/num*1e6:8.3f} us/pair')
+
+def make_library(path:Path, num:int, seed:int=0) -> None:
+    """
+    Function to write a synthetic library: a zotero.sqlite with the tables,
+    keys and index read by the application (documents with their title,
+    abstract, date, url and citation key fields and their authors) and a
+    better-bibtex.sqlite with the citation keys.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        Folder of the two databases.
+    num : int
+        Number of documents.
+    seed : int, optional
+        Random generator seed. The default is 0.
+
+    """
+    rng = np.random.default_rng(seed)
+    path.mkdir(parents=True, exist_ok=True)
+    zotero = sqlite3.connect(path / 'zotero.sqlite')
+    zotero.executescript("""
+        CREATE TABLE fields (fieldID INTEGER PRIMARY KEY, fieldName TEXT);
+        CREATE TABLE items (itemID INTEGER PRIMARY KEY, itemTypeID INT,
+                            dateAdded TEXT, clientDateModified TEXT,
+                            key TEXT);
+        CREATE TABLE itemAttachments (itemID INTEGER PRIMARY KEY,
+                                      parentItemID INT, linkMode INT);
+        CREATE TABLE itemData (itemID INT, fieldID INT, valueID INT,
+                               PRIMARY KEY (itemID, fieldID));
+        CREATE INDEX itemData_fieldID ON itemData(fieldID);
+        CREATE TABLE itemDataValues (valueID INTEGER PRIMARY KEY,
+                                     value TEXT);
+        CREATE TABLE creators (creatorID INTEGER PRIMARY KEY,
+                               firstName TEXT, lastName TEXT);
+        CREATE TABLE itemCreators (itemID INT, creatorID INT,
+                                   orderIndex INT,
+                                   PRIMARY KEY (itemID, orderIndex));
+        """)
+
+    fields = ['title', 'abstractNote', 'date', 'url', 'citationKey']
+    zotero.executemany("INSERT INTO fields VALUES (?, ?)",
+                       [(f+1, name) for f, name in enumerate(fields)])
+
+    # authors: the names and some variants of them
+    creators = [(name_variant(last, rng), name_variant(first, rng))
+                for last in LAST_NAMES for first in FIRST_NAMES]
+
+    zotero.executemany("INSERT INTO creators VALUES (?, ?, ?)",
+                       [(c+1, first, last) for c, (last, first)
+                        in enumerate(creators)])
+
+    items = [] ; attach = [] ; data = [] ; values = [] ; links = [] ; keys = []
+    for p in range(num):
+        item = 2*p+1
+        date = f'20{10+p % 16:02d}-0{1+p % 9}-1{p % 10} 10:00:00'
+        items += [(item, 2, date, date, f'I{item:07d}'),
+                  (item+1, 3, date, date, f'A{item+1:07d}')]
+
+        attach.append((item+1, item, 0))
+        key = f'{creators[p % len(creators)][0]}{2010+p % 16}_{p}'
+        texts = [f'Title of the document {p}',
+                 ' '.join(['Abstract of the document.']*40),
+                 date[:10], f'https://doi.org/10.0000/{p}', key]
+
+        for f, text in enumerate(texts):
+            values.append((len(values)+1, text))
+            data.append((item, f+1, len(values)))
+
+        for o in range(int(rng.integers(1, 6))):
+            links.append((item, int(rng.integers(1, len(creators)+1)), o))
+
+        keys.append((item, f'I{item:07d}', key))
+
+    zotero.executemany("INSERT INTO items VALUES (?, ?, ?, ?, ?)", items)
+    zotero.executemany("INSERT INTO itemAttachments VALUES (?, ?, ?)",
+                       attach)
+
+    zotero.executemany("INSERT INTO itemData VALUES (?, ?, ?)", data)
+    zotero.executemany("INSERT INTO itemDataValues VALUES (?, ?)", values)
+    zotero.executemany("INSERT INTO itemCreators VALUES (?, ?, ?)", links)
+    zotero.commit()
+    zotero.close()
+
+    better_bibtex = sqlite3.connect(path / 'better-bibtex.sqlite')
+    better_bibtex.execute("CREATE TABLE citationkey (itemID INT, itemKey "
+                          "TEXT, citationKey TEXT)")
+
+    better_bibtex.executemany("INSERT INTO citationkey VALUES (?, ?, ?)",
+                              keys)
+
+    better_bibtex.commit()
+    better_bibtex.close()
+
+def bench_load(num:int, repeat:int) -> None:
+    """
+    Benchmark of the database loading on a synthetic library, with and
+    without the reading settings of the snapshots (immutable, memory
+    mapping and page cache, see Engine.connect_snapshot), in the normal
+    and low memory modes.
+
+    Parameters
+    ----------
+    num : int
+        Number of documents of the library.
+    repeat : int
+        Number of runs, the best one is kept.
+
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        start = perf_counter()
+        make_library(Path(folder), num)
+        print(f'{num} documents library written in '
+              f'{perf_counter()-start:.2f} s')
+
+        engine = Engine(config_path=Path(folder) / 'none.ini')
+        engine.to_path = Path(folder)
+        tuned = (engine.sqlite_immutable, engine.sqlite_mmap,
+                 engine.sqlite_cache)
+
+        for low_memory in [False, True]:
+            print('low memory mode' if low_memory else 'normal mode')
+            engine.low_memory = low_memory
+            for label, settings in [('SQLite defaults', (False, 0, 0)),
+                                    ('immutable, mmap, cache', tuned)]:
+                (engine.sqlite_immutable, engine.sqlite_mmap,
+                 engine.sqlite_cache) = settings
+
+                t = best_time(engine.load_database, repeat)
+                print(f'    {label:<42} {t:8.3f} s')
+
+def bench_startup(repeat:int) -> None:
+    """
+    Benchmark of the start of the application, each run in a new
+    interpreter: time until the interface window is open, until the numba
+    kernels are warmed up (in the background) and until the engine alone
+    (cli.py) is ready. Without display, set SDL_VIDEODRIVER=dummy.
+
+    Parameters
+    ----------
+    repeat : int
+        Number of runs, the best one is kept.
+
+    """
+    scripts = [
+        ("import main ; manager = main.Manager() ; print('window') ; "
+         "manager.warmup.join() ; print('kernels')", ['window', 'kernels']),
+        ("import engine ; engine.Engine() ; print('engine')", ['engine'])]
+
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+    times = {}
+    for script, steps in scripts:
+        for _ in range(repeat):
+            start = perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, '-c', script], stdout=subprocess.PIPE,
+                cwd=Path(__file__).parent, env=env, text=True)
+
+            for line in process.stdout:
+                if line.strip() in steps:
+                    times.setdefault(line.strip(), []).append(
+                        perf_counter()-start)
+
+            process.wait()
+
+    labels = {'window': 'interface window open',
+              'kernels': 'numba kernels warmed up',
+              'engine': 'engine ready (cli.py)'}
+
+    for step, label in labels.items():
+        print(f'{label:<42} {min(times[step]):8.3f} s')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmarks of the Zotero authors application.')
+
+    parser.add_argument('bench', choices=['distances', 'load', 'startup'],
+                        help='Benchmark to run.')
+
+    parser.add_argument('--num', type=int, default=50_000,
+                        help='Number of name pairs or of documents.')
+
+    parser.add_argument('--treshold', type=float, default=0.2,
+                        help='Distance treshold.')
+
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of runs, the best one is kept.')
+
+    args = parser.parse_args()
+    if args.bench == 'distances':
+        bench_distances(args.num, args.treshold, args.repeat)
+    elif args.bench == 'load':
+        bench_load(args.num, args.repeat)
+    elif args.bench == 'startup':
+        bench_startup(args.repeat)
@@ -2,8 +2,76 @@
 import pygame
 import numpy as np
 from time import time
+from collections import OrderedDict
 
-pygame.init()
+class Text_cache:
+    """
+    Least recently used cache of rendered text surfaces, keyed by (text,
+    font, color). It is bounded by the memory of the surfaces. Only used
+    from the interface thread.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Maximum memory of the cached surfaces. The default is 16 MB.
+
+    """
+    def __init__(self, max_bytes:int=16*2**20) -> None:
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.surfaces = OrderedDict()
+
+    def render(self, text:str, font:pygame.font.Font, color='black'
+               ) -> pygame.surface.Surface:
+        """
+        Function to get the rendered surface of a text, only rendered if it
+        is not in the cache.
+
+        Parameters
+        ----------
+        text : str
+            Text to render.
+        font : pygame.font.Font
+            Font to use for rendering.
+        color : str | tuple, optional
+            Text color. The default is 'black'.
+
+        Returns
+        -------
+        surface : pygame.surface.Surface
+            Rendered text.
+
+        """
+        key = (text, font, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+
+        surface = font.render(text, 1, color)
+        self.surfaces[key] = surface
+        self.n_bytes += self.size(surface)
+        while (self.n_bytes > self.max_bytes) and (len(self.surfaces) > 1):
+            _, old = self.surfaces.popitem(last=False)
+            self.n_bytes -= self.size(old)
+
+        return surface
+
+    def size(self, surface:pygame.surface.Surface) -> int:
+        """
+        Memory of a surface in bytes.
+        """
+        return surface.get_width()*surface.get_height()*surface.get_bytesize()
+
+    def clear(self) -> None:
+        """
+        Function to empty the cache (when the fonts or SCALE change).
+        """
+        self.surfaces.clear()
+        self.n_bytes = 0
+
+# Rendered texts shared by the buttons and the application
+TEXT_CACHE = Text_cache()
 
 class Button:
     """
@@ -62,8 +130,7 @@ class Button:
         self.text_blit = []
         self.text_blit_pos = []
         for i in range(self.number):
-            self.text_blit.append(
-                self.font.render(self.text[i], 1,'black'))
+            self.text_blit.append(TEXT_CACHE.render(self.text[i], self.font))
 
             # Centering the text surface on the button center
             self.text_blit_pos.append([
@@ -265,7 +332,7 @@ class Button_keyboard(Button):
         self.center = self.center[0]
         self.draw_box = self.draw_box[0]
 
-        self.text_blit = self.font.render(self.temp, 1, 'black')
+        self.text_blit = TEXT_CACHE.render(self.temp, self.font)
         self.text_blit_pos = [self.center[0]-self.text_blit.get_width()/2,
                               self.center[1]-self.text_blit.get_height()/2]
 
@@ -317,7 +384,7 @@ class Button_keyboard(Button):
         """
         tot_len = []
         for c in self.repre:
-            tx = self.font.render(c, 1, 'black')
+            tx = TEXT_CACHE.render(c, self.font)
             tot_len += [tx.get_width()]
 
         self.xy_cursor[0] = (self.center[0] - sum(tot_len) / 2 +
@@ -334,7 +401,7 @@ class Button_keyboard(Button):
         else:
             self.temp = np.sum(self.repre)
 
-        self.text_blit = self.font.render(self.temp, 1, 'black')
+        self.text_blit = TEXT_CACHE.render(self.temp, self.font)
         self.text_blit_pos = [self.center[0]-self.text_blit.get_width()/2,
                               self.center[1]-self.text_blit.get_height()/2]
 
@@ -559,14 +626,15 @@ class Scroll_barr:
         app : Manager(DataGest)
             The main application instance to update its attributes.
             Used attribute:
-                liste1 : list, first list of the authors comparison.
+                num_rows : int, number of lines of the authors comparison.
                 mx_tx : int, maximum number of shown comparison lines.
                 text_height : float, height of a comparison line.
                 tex_y : int, starting index of the comparison lines.
                 delta_txy : int, true number of shown comparison lines.
 
         """
-        self.n_line = len(app.liste1)
+        # called again when the comparison adds lines, the shown ones stay
+        self.n_line = app.num_rows
         if self.n_line > 0:
             self.in_box_h = self.y_sp - self.y_st - 2 * self.lin_w
             if app.mx_tx < self.n_line:
@@ -581,6 +649,7 @@ class Scroll_barr:
                 self.max_travel = self.in_box_h - self.scroller[3]
                 self.max_index  = self.n_line - app.mx_tx
                 self.delta_h = self.max_travel / self.max_index
+                self.scroller[1] = self.lin_w + self.delta_h * app.tex_y
 
         # Calculate the number of lines currently printed in comparison panel
         if (self.n_line - app.tex_y) >= app.mx_tx:
@@ -724,7 +793,7 @@ class Text:
         self.text_blit = []
         self.text_pos = []
         for i in range(len(self.x)):
-            self.text_blit.append(self.font.render(self.text[i], 1, 'black'))
+            self.text_blit.append(TEXT_CACHE.render(self.text[i], self.font))
             self.text_pos.append([self.x[i]-self.text_blit[i].get_width()/2,
                                   self.y[i]-self.text_blit[i].get_height()/2])
 
@@ -0,0 +1,225 @@
+import os
+import sys
+import argparse
+import numpy as np
+from time import perf_counter
+
+# Matching engine (database, compilation and comparison), without pygame
+from engine import Engine
+
+# Exit status codes
+EXIT_OK = 0
+EXIT_ERROR = 1      # database not found or not readable
+EXIT_CANCELLED = 3  # interrupted by the user (Ctrl+C)
+
+# Engine error types with their message
+ERROR_MESSAGES = {
+    'no file': 'No database was found from the given access path.',
+    'no compil': 'The loaded database has no document to export.'}
+
+def parse_arguments(argv:list) -> argparse.Namespace:
+    """
+    Function to define and read the command line arguments.
+
+    Parameters
+    ----------
+    argv : list
+        Command line arguments (without the program name).
+
+    Returns
+    -------
+    args : argparse.Namespace
+        Parsed arguments.
+
+    """
+    parser = argparse.ArgumentParser(
+        description='Detect duplicated authors of a Zotero library without '
+                    'the graphical interface.')
+
+    parser.add_argument('--config', default='main.ini',
+                        help='ini file giving DATA_PATH and SAVE_PATH '
+                             '(default: main.ini).')
+
+    parser.add_argument('--data-path', default=None,
+                        help='Zotero data folder, replace DATA_PATH.')
+
+    parser.add_argument('--save-path', default=None,
+                        help='Folder of the copy and exports, replace '
+                             'SAVE_PATH.')
+
+    parser.add_argument('--algo', default='Levenshtein',
+                        choices=['Perfect', 'Levenshtein',
+                                 'DamerauLevenshtein'],
+                        help='Comparison algorithm (default: Levenshtein).')
+
+    parser.add_argument('--compare', default='lastname',
+                        choices=['lastname', 'firstname', 'bothname'],
+                        help='Compared names (default: lastname).')
+
+    parser.add_argument('--treshold', type=float, default=0.10,
+                        help='Maximum distance for the distance algorithms '
+                             '(default: 0.10).')
+
+    parser.add_argument('--both', default='AND', choices=['AND', 'OR', 'AVG'],
+                        help='How both names distances are combined '
+                             '(default: AND).')
+
+    parser.add_argument('--special', action='store_true',
+                        help='Keep the special characters (no é -> e).')
+
+    parser.add_argument('--abbreviation', action='store_true',
+                        help='Match abbreviated first names with the full '
+                             'ones.')
+
+    parser.add_argument('--keys', action='store_true',
+                        help='Add the citation keys in the comparison.')
+
+    parser.add_argument('--filter', default=None,
+                        choices=['today', 'tod-1w', 'tod-1m', 'tod-1y'],
+                        help='Only authors of documents added since this '
+                             'date.')
+
+    parser.add_argument('--exports', nargs='+', default=['csv'],
+                        choices=['csv', 'json'],
+                        help='Files to write: csv (comparison) and/or json '
+                             '(database) (default: csv).')
+
+    parser.add_argument('--shards', type=int, default=None,
+                        help='Worker processes of the comparison, replace '
+                             'SHARDS.')
+
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='Authors pairs per shard, replace CHUNK_SIZE.')
+
+    parser.add_argument('--low-memory', action='store_true',
+                        help='Only read the needed columns and release the '
+                             'tables once compiled, replace LOW_MEMORY.')
+
+    parser.add_argument('--build-kernels', action='store_true',
+                        help='Compile the distance kernels into the numba '
+                             'cache (CACHE_DIR of the NUMBA section of the '
+                             'ini file) and exit, i.e. after installation.')
+
+    parser.add_argument('--quiet', action='store_true',
+                        help='Do not print the summary.')
+
+    args = parser.parse_args(argv)
+    if not (0. <= args.treshold <= 1.):
+        parser.error('--treshold must be between 0 and 1.')
+
+    for name in ['shards', 'chunk_size']:
+        if (getattr(args, name) is not None) and (getattr(args, name) < 1):
+            parser.error(f'--{name.replace("_", "-")} must be at least 1.')
+
+    return args
+
+def run(args:argparse.Namespace) -> int:
+    """
+    Function to run the snapshot, loading, compilation, comparison and
+    exports of one library.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed command line arguments.
+
+    Returns
+    -------
+    int
+        Exit status code.
+
+    """
+    timings = {}
+    start = perf_counter()
+    try:
+        engine = Engine(config_path=args.config)
+        engine.algo = args.algo
+        engine.to_compare = args.compare
+        engine.treshold = args.treshold
+        engine.both_comp = args.both
+        engine.to_filter = args.filter
+        engine.use_special = np.array([args.special])
+        engine.filter_abv = np.array([args.abbreviation])
+        engine.add_key = np.array([args.keys])
+        if args.shards is not None:
+            engine.shards = args.shards
+        if args.chunk_size is not None:
+            engine.chunk_size = args.chunk_size
+        if args.low_memory:
+            engine.low_memory = True
+
+        timings['startup'] = perf_counter()-start
+
+        if args.build_kernels:
+            # the background warm-up does not raise, this call does
+            engine.warm_up()
+            if not args.quiet:
+                cache = os.environ.get('NUMBA_CACHE_DIR', '__pycache__')
+                print(f'Distance kernels compiled in '
+                      f'{perf_counter()-start:.2f}s into {cache}')
+
+            return EXIT_OK
+
+        phase = perf_counter()
+        engine.duplicate_table(args.data_path, args.save_path)
+        if engine.state == 'ERROR':
+            print(f'{ERROR_MESSAGES[engine.error_type]} Given path: '
+                  f'{engine.from_path}', file=sys.stderr)
+            return EXIT_ERROR
+
+        engine.load_database()
+        timings['load'] = perf_counter()-phase
+
+        phase = perf_counter()
+        engine.treat_by_paper()
+        timings['compile'] = perf_counter()-phase
+
+        phase = perf_counter()
+        engine.comparison_matching()
+        timings['match'] = perf_counter()-phase
+
+        phase = perf_counter()
+        engine.start_memory()
+        if 'csv' in args.exports:
+            engine.export_comparaison()
+        if 'json' in args.exports:
+            engine.export_db2json()
+            if engine.state == 'ERROR':
+                print(ERROR_MESSAGES[engine.error_type], file=sys.stderr)
+                return EXIT_ERROR
+
+        timings['export'] = perf_counter()-phase
+        memory = dict(engine.phase_memory, export=engine.peak_memory())
+
+    except KeyboardInterrupt:
+        print('Interrupted.', file=sys.stderr)
+        return EXIT_CANCELLED
+
+    except Exception as e:
+        # invalid ini value, unreadable or unexpected database
+        print(f'Error: {type(e).__name__}: {e}', file=sys.stderr)
+        return EXIT_ERROR
+
+    timings['total'] = perf_counter()-start
+    if not args.quiet:
+        print(f'{engine.from_path}: {len(engine.paper_keys)} documents, '
+              f'{len(engine.auth_keys)} authors, {engine.num_match} matches')
+
+        print(' '.join([f'{k}={v:.2f}s' for k, v in timings.items()]))
+        if memory['load'] is not None:
+            # peak resident memory of each phase where it can be reset,
+            # else of the process at the end of each phase
+            label = ('peak RSS per phase ' if engine.memory_per_phase else
+                     'peak RSS so far ')
+
+            print(label+' '.join([f'{k}={v:.0f}MB'
+                                  for k, v in memory.items()]))
+
+        # pairs removed by each stage
+        print(' '.join([f'{k}={v}' if k == 'pairs' else f'{k}=-{v}'
+                        for k, v in engine.filter_report.items()]))
+
+    return EXIT_OK
+
+if __name__ == '__main__':
+    sys.exit(run(parse_arguments(sys.argv[1:])))
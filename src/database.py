@@ -1,33 +1,24 @@
 
-import os
-import json
-import shutil
+import queue
+import traceback
 import pygame
-import sqlite3
+import threading
 import numpy as np
-import pandas as pd
-import configparser
-from time import time
-from pathlib import Path
-from copy import deepcopy
-from unidecode import unidecode
-from scipy.spatial.distance import cdist
 
-# For string distances
-import distances
+# Matching engine (database, compilation and comparison)
+from engine import Engine
 
 # Object to manage the buttons
 from buttons import (Button_selection, Button_app_actions, Text, Inidication,
-                     Button_keyboard, Scroll_barr)
+                     Button_keyboard, Scroll_barr, TEXT_CACHE)
 
-pygame.init()
-
-class DataGest:
+class DataGest(Engine):
     """
-    Parent class managing the logic: 
-        - Manipulation of SQLite Zotero/Better-BibTeX databases.
-        - Data processing via Pandas and NumPy.
+    Parent class of the user interface, built on the matching Engine:
         - Management of the application state and buttons.
+        - Worker thread of the engine long phases, with their progression
+          bar and cancellation.
+        - Display of the citation keys.
 
     """
 
@@ -36,22 +27,35 @@ class DataGest:
 
     # Frame Per Seconds
     FPS = 60
+    # Maximum waiting time for an event when nothing runs, in milliseconds
+    IDLE_WAIT = 500
 
     # Colors
     bg_color = (245, 245, 213)  # Cream background
     bt_color = (180, 180, 180)  # Grey for buttons/panels
 
     def __init__(self):
+        # only the window and fonts modules of pygame are used
+        pygame.display.init()
+        pygame.font.init()
+        super().__init__()
+        # the long phases of the engine run in a worker thread, reporting
+        # through a queue drained at each frame
+        self.progress = self.post_progress
+        self.worker = None                    # running threading.Thread
+        self.worker_queue = queue.Queue()     # progression and results
+        self.cancel_event = threading.Event() # set by the Cancel button
+
+        # parts of the window to redraw at the next frame
+        self.full_redraw = True
+        self.dirty_rects = []
+
         # Window size
         self.WIDTH  = 1200 * self.SCALE
         self.HEIGHT =  700 * self.SCALE
 
         # font to use
-        self.TEXT_FONT  = pygame.font.SysFont(
-            'Arial', max([1, int(20*self.SCALE)]))
-
-        self.TITLE_FONT = pygame.font.SysFont(
-            'Arial', max([1, int(30*self.SCALE)]), bold=True)
+        self.set_fonts()
 
         # --- G/UI Constants ---
         # Vertical space for each line of text
@@ -69,8 +73,6 @@ class DataGest:
         # Comparison feilds x midle line division
         self.DIVIDERS = 790*self.SCALE
         self.prog_bar = False    # If a progression bar is render
-        self.index = 0           # Index of iteration bar
-        self.tot_idx = 1         # last index of the iteration bar
         # second part of progression bar text
         self.max_i_blit = self.TITLE_FONT.render('/ 1', 1, 'black')
         self.max_i_pos  = (0, 0) # where to draw the max iter num
@@ -78,77 +80,21 @@ class DataGest:
         self.idx_blit = self.TITLE_FONT.render('0', 1, 'black')
         self.idx_pos = (0, 0)    # where to draw the current iter
 
-        # Progression bar
-        self.st_pb = 110 * self.SCALE
-        self.sp_pb = 1080 * self.SCALE
-        self.h_pb = 450*self.SCALE-20*self.SCALE
-        self.l_pb = 450*self.SCALE+20*self.SCALE
-        self.width_pb = self.sp_pb - self.st_pb
-        self.pb_line = [[self.st_pb, self.h_pb], [self.st_pb, self.l_pb],
-                        [self.sp_pb, self.h_pb], [self.sp_pb, self.l_pb]]
-
-        self.prog_box = np.array([self.st_pb, self.h_pb, 0, 40*self.SCALE])
-        # refresh rate of the progression bar in milliseconds
-        self.refresh_rate = int(self.FPS * 2)
+        # Progression bar, placed by set_progress_layout
+        self.st_pb = 0 ; self.sp_pb = 0 # x start and stop
+        self.h_pb = 0 ; self.l_pb = 0   # y top and bottom
+        self.pb_text = [0, 0]           # x, y of the iteration numbers
+        self.width_pb = 0
+        self.pb_line = []
+        self.prog_box = np.zeros(4)
+        self.pb_rect = [0, 0, 0, 0]     # bar and numbers area
+        # refresh rate of the progression bar in milliseconds, one report
+        # per frame at most
+        self.refresh_rate = int(1000 / self.FPS)
 
         # white empty box
         self.box_tx = [400*self.SCALE, 0, 800*self.SCALE, self.HEIGHT]
 
-        # --- Gestion de l'État ---
-        self.state = 'IDLE'  # IDLE, LOADING, COMPUTING, ERROR, etc.
-        self.error_type = '' # For the error type gestion
-        self.comp_st = 0     # Compilation state (0: empty, 1: loaded,
-        #                       2: compiled)
-
-        # --- Paths and files ---
-        self.from_path = '' # origin path of the databse
-        self.to_path = ''   # path where to copy the database
-
-        # --- Data structur ---
-        self.data = {}             # raw Zotero tables
-        self.data_cite_key = {}    # Better-BibTeX citation keys
-        self.one_loaded = False    # True if db has been successfully loaded
-        self.use_zotero_db = False # Better-BibTex and zotero db has fused
-
-        self.papers = {}      # Indexed by Citation Key
-        self.authors = {}     # Indexed par first and last name
-        self.num_elem = 0     # Total number of documents
-
-        # --- Comparison parameters (with buttons interactions) ---
-        self.to_compare = None # 'lastname', 'firstname' or 'bothname'
-        self.to_filter = None  # 'today', 'tod-1w', etc.
-        self.treshold = 0.10   # treshold value for distance based algorithm
-
-        self.use_special = np.array([False]) # Keep or not the accents
-        self.filter_abv = np.array([False])  # Use only or not abreviations
-        self.add_key = np.array([False])     # Render citation keys
-        self.both_comp = 'AND' # how both name distance will be handle
-
-        self.auth_len_last  = np.zeros(0) # if last  name isn't given
-        self.auth_len_first = np.zeros(0) # if first name isn't given
-        self.letters   = {'l':{}, 'f':{}} # founded letter with bag column
-        self.bag_last  = np.zeros(0)      # last  name per letter count
-        self.bag_first = np.zeros(0)      # first name per letter count
-
-        # copy of papers
-        self.papers_save = {}
-        # optimization for comparison
-        self.auth_abv = np.zeros(0)
-
-        # --- Time gestion (NumPy vectorised) ---
-        self.today = np.array([time()]).astype('datetime64[s]').astype(
-            'datetime64[D]')
-
-        self.tod_1w = self.today -   7 # today minus one week
-        self.tod_1m = self.today -  31 # today minus one month
-        self.tod_1y = self.today - 365 # today minus one year
-        self.auth_time = np.zeros(0)   # for optimised comparison
-
-        # --- Comparison results ---
-        self.liste1 = [] # 1st list of the last / first name comparison
-        self.liste2 = [] # 2nd list of the last / first name comparison
-        self.light  = [] # if the line is white or grey
-
         # --- Buttons initialisation ---
         # Tab selection buttons
         self.pannels_bt = Button_selection(
@@ -380,6 +326,20 @@ class DataGest:
             font=self.TEXT_FONT, lin_w=3,
             target='export_jsonf', bt_color=self.bt_color)]
 
+        # To stop the running phase buttons, in the waiting window and in
+        # the control pannel (comparison)
+        self.cancel_bts = [Button_app_actions(
+            x_start=np.array([x_st]) * self.SCALE,
+            x_stop =np.array([x_st+150]) * self.SCALE,
+            y_start=np.array([y_st]) * self.SCALE,
+            y_stop =np.array([y_st+40]) * self.SCALE,
+            text=np.array(['Cancel']), font=self.TEXT_FONT, lin_w=3,
+            target='cancel_worker', bt_color=self.bg_color)
+            for x_st, y_st in [(525, 520), (125, 420)]]
+
+        self.cancel_bt = self.cancel_bts[0]
+        self.set_progress_layout(False)
+
         self.scroller = Scroll_barr(
             box=np.array([1180*self.SCALE, 0, 20*self.SCALE, self.HEIGHT]),
             colors=[(255, 255, 255), self.bt_color, (0, 0, 0)],
@@ -388,9 +348,6 @@ class DataGest:
         # Which tab to show
         self.pannel = 'DATA' # DATA, SETTINGS, EXECUTION
 
-        # Wich algorithm is choose
-        self.algo = None # Perfect, Levenshtein, DamerauLevenshtein
-
         # Text fields
         self.matching_txt = Text([200*self.SCALE]*3, np.array([75, 120, 170]
             )*self.SCALE, ['Compare by:', '/', 'Filters:'], self.TITLE_FONT)
@@ -425,6 +382,12 @@ class DataGest:
             'COMPARING': 'Authors comparaison is being computed...',
             'EXPORTING': 'Database is being exported...'}
 
+        # waiting states keeping the comparison pannel visible, with their
+        # message in the control pannel
+        self.live_states = {
+            'COMPARING': ['Authors comparaison', 'is being computed,',
+                          'the matches are shown', 'as they are found.']}
+
         # --- Error messages dictionaries ---
         y_centers = (np.array([350, 400, 450, 500]) * self.SCALE).tolist()
         self.error_messages = {
@@ -434,6 +397,11 @@ class DataGest:
             'Given path:', str(self.from_path)],
           'y_center':y_centers},
 
+         'worker':{'text':[
+           'The running phase stopped on an error:', '',
+           'The details are printed in the terminal.'],
+          'y_center':y_centers[:3]},
+
          'no betbib':{'text':[
            'No Better-BibTex database was found from the given access path,',
            'make sure you writte the correct path in the "main.ini" file.',
@@ -486,147 +454,20 @@ class DataGest:
           "Maximum distance must be greater or equal to 0."],
          'y_center':y_centers[:2]}}
 
-        # Warm-Up for numba.njit acceleration
-        warmup_1 = np.array(['a', 'b', 'c', 'd', 'e'])
-        warmup_2 = np.array(['f', 'g', 'h', 'i', 'j'])
-        distances.Levenshtein_distance(warmup_1, warmup_2)
-        distances.Damerau_Levenshtein_distance(warmup_1, warmup_2)
-
-    def reduce_string(self, string:str) -> str:
-        """
-        Function to remove space and dot in a string
-
-        Parameters
-        ----------
-        string : str
-            String to clean.
-
-        Returns
-        -------
-        str
-            Cleaned string.
-
-        """
-        return string.replace(' ', '').replace('.', '')
-
-    def duplicate_table(self) -> None:
-        """
-        Function to duplicate the database tagerted with the main.ini file to
-        be able to read sql file even when Zotero app is running.
-        """
-        config = configparser.ConfigParser()
-        config.read('main.ini')
-        self.from_path = Path(config['PATH'].get('DATA_PATH'))
-        self.to_path = Path(config['PATH'].get('SAVE_PATH'))
-        self.to_path.mkdir(parents=True, exist_ok=True)
-        if os.path.isfile(self.from_path / 'zotero.sqlite'):
-            shutil.copyfile(self.from_path / 'zotero.sqlite',
-                            self.to_path   / 'zotero.sqlite')
-
-            if os.path.isfile(self.from_path / 'better-bibtex.sqlite'):
-                self.use_zotero_db = False
-                shutil.copyfile(self.from_path / 'better-bibtex.sqlite',
-                                self.to_path   / 'better-bibtex.sqlite')
-
-
-            elif os.path.isfile(self.from_path / 'better-bibtex.migrated'):
-                self.use_zotero_db = False
-                shutil.copyfile(self.from_path / 'better-bibtex.migrated',
-                                self.to_path   / 'better-bibtex.migrated')
-
-            else:
-                # if no better-bibtex db found => will use zotero db
-                self.use_zotero_db = True
-
-        else:
-            self.state = 'ERROR'
-            self.error_type = 'no file'
-
-    def extract_valid_tables(self, path:Path) -> dict:
+    def set_fonts(self) -> None:
         """
-        Function to extract all databse from the copied `.sqlite` files and
-        store them under pandas.DataFrame in a dictionary.
-
-        Parameters
-        ----------
-        path : pathlib.Path
-            Access path to database.
-
-        Returns
-        -------
-        dico_tables : pd.DataFrame
-            Data frame with the extracted data.
-
+        Function to (re)build the fonts from SCALE, the texts rendered with
+        the previous ones are removed from the cache.
         """
-        # Connection to SQLite database copied in read-only mode
-        connect = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
-
-        # Query to get list of all tables in database
-        query = "SELECT name FROM sqlite_master WHERE type='table';"
-
-        # Execute the query and fetch all results
-        cursor = connect.cursor()
-
-        cursor.execute(query)
-        tables = cursor.fetchall()
-        dico_tables = {}
-        for table in tables:
-            query_it = "SELECT * FROM "+table[0]
-
-            # Uses pandas to execute the query and store data in a DataFrame
-            df = pd.read_sql_query(query_it, connect)
-            if len(df) > 0:
-                dico_tables[table[0]] = df.copy()
-
-        # Closes the connection to the database
-        connect.close()
-
-        return dico_tables
-
-    def load_database(self) -> None:
-        """
-        Function to extract the databse and update associated parameters.
-        """
-        # Extracts data from the Zotero database
-        path_data = self.to_path / 'zotero.sqlite'
-        self.data = self.extract_valid_tables(path_data)
-        if not self.use_zotero_db:
-            # Extracts data from the Better BibTex database
-            if os.path.isfile(self.to_path / 'better-bibtex.sqlite'):
-                path_data = self.to_path / 'better-bibtex.sqlite'
-            elif os.path.isfile(self.to_path / 'better-bibtex.migrated'):
-                path_data = self.to_path / 'better-bibtex.migrated'
-        
-            self.data_cite_key = self.extract_valid_tables(path_data)
-            self.data_cite_key = self.data_cite_key['citationkey'].loc[:,
-                ['citationKey', 'itemID', 'itemKey']]
-
-        else:
-            key_field_id = int(self.data['fields'].loc[
-                self.data['fields']['fieldName'] == 'citationKey',
-                'fieldID'].values[0])
-
-            self.data_cite_key = self.data['itemData'][
-                self.data['itemData']['fieldID'] == key_field_id
-                ].reset_index(drop=True)
-
-            self.data_cite_key = self.data_cite_key.merge(
-                self.data['itemDataValues'], on='valueID')
-
-            self.data_cite_key = self.data_cite_key.merge(
-                self.data['items'].loc[:, ['itemID', 'key']], on='itemID')
-
-            self.data_cite_key = self.data_cite_key.rename(
-                columns={'value':'citationKey', 'key':'itemKey'})
+        TEXT_CACHE.clear()
+        self.TEXT_FONT  = pygame.font.SysFont(
+            'Arial', max([1, int(20*self.SCALE)]))
 
-            self.data_cite_key = self.data_cite_key.drop(columns=['fieldID',
-                                                                  'valueID'])
+        self.TITLE_FONT = pygame.font.SysFont(
+            'Arial', max([1, int(30*self.SCALE)]), bold=True)
 
-        self.one_loaded = True
-        self.load_sq.color = [0, 200, 0]
-        if self.comp_st == 2:
-            self.comp_sq.color = [242, 133, 0]
-            self.comp_st = 1
+        # shortened texts of the comparison pannel, measured with TEXT_FONT
+        self.fit_cache = {}
 
     def initialize_bar(self, max_ite:int) -> None:
         """
@@ -639,708 +480,258 @@ class DataGest:
             Total number of iteration expected.
 
         """
-        self.index = 0
-        self.tot_idx = max_ite
         self.max_i_blit = self.TEXT_FONT.render(
-            '/ '+str(self.tot_idx), 1, 'black')
+            '/ '+str(max_ite), 1, 'black')
 
-        self.max_i_pos = (600*self.SCALE,
-                          400*self.SCALE-self.max_i_blit.get_height()/2)
+        self.max_i_pos = (self.pb_text[0],
+                          self.pb_text[1]-self.max_i_blit.get_height()/2)
 
-        self.idx_blit = self.TEXT_FONT.render(str(self.index), 1, 'black')
-        self.idx_pos = [595*self.SCALE-self.idx_blit.get_width(),
-                        400*self.SCALE-self.max_i_blit.get_height()/2]
+        self.idx_blit = self.TEXT_FONT.render('0', 1, 'black')
+        self.idx_pos = [self.pb_text[0]-5*self.SCALE-self.idx_blit.get_width(),
+                        self.pb_text[1]-self.max_i_blit.get_height()/2]
 
-        self.width_pb = (self.sp_pb - self.st_pb) / self.tot_idx
+        self.width_pb = (self.sp_pb - self.st_pb) / max(max_ite, 1)
         self.prog_box[2] = 0
         self.prog_bar = True
 
-    def treat_by_paper(self, app) -> None:
+    def set_progress_layout(self, side:bool) -> None:
         """
-        Function to extract usefull documents informations and pre compute
-        some of ther caracteristics for optimisation.
+        Function to place the progression bar and the Cancel button in the
+        waiting window, or in the control pannel to let the comparison
+        pannel visible.
 
         Parameters
         ----------
-        app : Manager(DataGest)
-            Manager class to get the other attributes.
-
-        Informations extracted / used:
-        keys[i]: str
-            Beter bibtex citation key
-            itemID: int
-                ID of the document, used as a link with the creator table.
-            itemKey: str
-                Hash key where the files linked to the document are stored.
-            parentItemID: int
-                An other ID of the document to make the link between the
-                tables.
-            date: numpy.ndarray
-                Array of dtype: datetime64[D] It is defined when the document
-                was created.
-            title: str
-                The document title.
-            firstName: list
-                List of the authors first name.
-            lastName: list
-                List of the authors last name.
-            firstName_uc: list
-                List of the authors first name under no special caracter.
-            lastName_uc: list
-                List of the authors last name under no special caracter.
-
-        """
-        self.papers = {}
-        self.authors = {}
-        self.num_elem = len(self.data_cite_key)
-        # better bibtex citation keys will be used as acces keys
-        # for the dictionary
-        keys = np.copy(self.data_cite_key.loc[:, 'citationKey'])
-        self.initialize_bar(self.num_elem)
-        app.draw()
-        stop = False ; t = pygame.time.get_ticks()
-        for i in range(self.num_elem):
-            self.papers[keys[i]] = {}
-            # Various id linked to the document
-            self.papers[keys[i]]['itemID'] = self.data_cite_key.loc[
-                                                         i, 'itemID']
-
-            self.papers[keys[i]]['itemKey'] = self.data_cite_key.loc[
-                                                         i, 'itemKey']
-
-            idx_par = np.argwhere(self.data['itemAttachments'].loc[:,
-                                        'parentItemID'] == self.papers[
-                                        keys[i]]['itemID'])[0, 0]
-
-            self.papers[keys[i]]['parentItemID'] = self.data[
-                               'itemAttachments'].loc[idx_par, 'itemID']
-
-            # When the document was created in zotero
-            idx_tim = np.argwhere(self.data['items'].loc[:, 'itemID'] ==
-                                  self.papers[keys[i]]['parentItemID'])[0, 0]
-
-            add_time = np.array([self.data['items'].loc[idx_tim,
-                    'clientDateModified']], dtype='datetime64[s]')
-
-            self.papers[keys[i]]['date'] = add_time.astype('datetime64[D]')
-
-            # Get the tile of the document
-            idx_dat = np.argwhere(
-                self.data['itemData'].loc[:, 'itemID'] ==
-                self.papers[keys[i]]['parentItemID'])[:, 0]
-
-            for j in idx_dat:
-                if self.data['itemData'].loc[j, 'fieldID'] == 1:
-                    idx_tit = np.argwhere(
-                        self.data['itemDataValues'].loc[:, 'valueID'] ==
-                        self.data['itemData'].loc[j, 'valueID'])[0, 0]
-
-                    self.papers[keys[i]]['title'] = self.data[
-                        'itemDataValues'].loc[idx_tit, 'value']
-
-            # Get the first and last name of the authors
-            idx_item = np.argwhere(self.data['itemCreators'].loc[:,
-                    'itemID'] == self.papers[keys[i]]['itemID'])[:, 0]
-
-            self.papers[keys[i]]['firstName'] = []
-            self.papers[keys[i]]['lastName'] = []
-            self.papers[keys[i]]['firstName_uc'] = []
-            self.papers[keys[i]]['lastName_uc'] = []
-            for j in idx_item:
-                idx_crea = np.argwhere(
-                    self.data['creators'].loc[:, 'creatorID'] ==
-                    self.data['itemCreators'].loc[j, 'creatorID'])[0, 0]
-
-                fname = self.data['creators'].loc[idx_crea, 'firstName']
-                lname = self.data['creators'].loc[idx_crea, 'lastName']
-                self.papers[keys[i]]['firstName'].append(fname)
-                self.papers[keys[i]]['lastName'].append(lname)
-                self.papers[keys[i]]['firstName_uc'].append(unidecode(fname))
-                self.papers[keys[i]]['lastName_uc'].append(unidecode(lname))
-
-                # author oriented dictionary
-                cle_aut = lname+', '+fname
-                if cle_aut not in list(self.authors.keys()):
-                    self.authors[cle_aut] = {}
-                    self.authors[cle_aut]['date'] = self.papers[
-                        keys[i]]['date']
-
-                    self.authors[cle_aut]['citekeys'] = [] 
-                    self.authors[cle_aut]['citekeys'].append(keys[i])
-
-                    self.authors[cle_aut]['dispkeys'] = [] 
-                    tx = self.TEXT_FONT.render(keys[i], 1, 'black')
-                    if tx.get_width() < self.TXT_LEN[1]:
-                        self.authors[cle_aut]['dispkeys'].append(keys[i])
-                    else:
-                        c = -1
-                        while tx.get_width() > self.TXT_LEN[0]:
-                            tx = self.TEXT_FONT.render(keys[i][:c], 1,
-                                                       'black')
-                            c -= 1
-
-                        self.authors[cle_aut]['dispkeys'].append(
-                                    keys[i][:c]+'...')
-
-                    self.authors[cle_aut]['firstName'] = fname
-                    self.authors[cle_aut]['lastName'] = lname
-                    self.authors[cle_aut]['firstName_uc'] = unidecode(fname)
-                    self.authors[cle_aut]['lastName_uc'] = unidecode(lname)
-
-                else:
-                    if keys[i] not in self.authors[cle_aut]['citekeys']:
-                        self.authors[cle_aut]['citekeys'].append(keys[i])
-                        tx = self.TEXT_FONT.render(keys[i], 1, 'black')
-                        if tx.get_width() < self.TXT_LEN[1]:
-                            self.authors[cle_aut]['dispkeys'].append(keys[i])
-                        else:
-                            c = -1
-                            while tx.get_width() > self.TXT_LEN[0]:
-                                tx = self.TEXT_FONT.render(keys[i][:c], 1,
-                                                           'black')
-
-                                c -= 1
-
-                            self.authors[cle_aut]['dispkeys'].append(
-                                        keys[i][:c]+'...')
-
-                    if (self.papers[keys[i]]['date'] >
-                            self.authors[cle_aut]['date']):
-
-                        self.authors[cle_aut]['date'] = self.papers[
-                            keys[i]]['date']
-
-            self.index = i+1
-            if pygame.time.get_ticks() - t > self.refresh_rate:
-                t = pygame.time.get_ticks()
-                self.prog_box[2] = self.index * self.width_pb
-                app.draw()
-
-                stop = self.quit_in_loop(app)
-                if stop:
-                    break
-
-        if not stop:
-            # 1d array for time comparison wich will be faster than loop
-            authkeys = np.sort(list(self.authors.keys()))
-            self.auth_time = np.zeros(len(authkeys), dtype='datetime64[D]')
-            # if author first name have '.' in it
-            self.auth_abv = np.zeros(len(authkeys), dtype=bool)
-            # author last and first name length
-            self.auth_len_last  = np.zeros(len(authkeys))
-            self.auth_len_first = np.zeros(len(authkeys))
-            # letters in authors last and first name
-            self.bag_last = np.zeros((len(authkeys), 256), dtype='uint8')
-            self.bag_first = np.zeros((len(authkeys), 256), dtype='uint8')
-            c_l, c_f = 0, 0
-            for i in range(len(authkeys)):
-                self.auth_time[i] = self.authors[authkeys[i]]['date'][0]
-                self.auth_abv[i] = '.' in self.authors[authkeys[i]][
-                                                                'firstName']
-
-                l_red = self.reduce_string(
-                    self.authors[authkeys[i]]['lastName'])
-
-                f_red = self.reduce_string(
-                    self.authors[authkeys[i]]['firstName'])
-
-                self.authors[authkeys[i]]['l_Name_r'] = np.array(list(l_red))
-                self.authors[authkeys[i]]['f_Name_r'] = np.array(list(f_red))
-                self.authors[authkeys[i]]['l_Name_uc_r'] = np.array(list(
-                                                            unidecode(l_red)))
-
-                self.authors[authkeys[i]]['f_Name_uc_r'] = np.array(list(
-                                                            unidecode(f_red)))
-
-                self.auth_len_last[i]  = len(l_red)
-                self.auth_len_first[i] = len(f_red)
-
-                u_l, v_l = np.unique(list(l_red), return_counts=True)
-                for j in range(len(u_l)):
-                    if u_l[j] not in self.letters['l']:
-                        self.letters['l'][u_l[j]] = c_l
-                        self.bag_last[i, c_l] = v_l[j]
-                        c_l += 1
-                    else:
-                        self.bag_last[i, c_l] = v_l[j]
-
-                u_f, v_f = np.unique(list(f_red), return_counts=True)
-                for j in range(len(u_f)):
-                    if u_f[j] not in self.letters['f']:
-                        self.letters['f'][u_f[j]] = c_f
-                        self.bag_first[i, c_f] = v_f[j]
-                        c_f += 1
-                    else:
-                        self.bag_first[i, c_f] = v_f[j]
-
-            self.bag_last = self.bag_last[:, :c_l]
-            self.bag_first = self.bag_first[:, :c_f]
-            self.prog_bar = False
-
-    def preparation_matching(self) -> (np.ndarray, str, str, str, str):
-        """
-        Function to make the global first step for every mathing options.
-
-        Returns
-        -------
-        mask_operations : numpy.ndarray
-            Numpy 1 dimensional boolean array.
-        firstName : str
-            First name author.
-        lastName : str
-            Last name author.
+        side : bool
+            If they are drawn in the control pannel (True) or in the waiting
+            window (False).
 
         """
-        # Compute time filtering using numpy.ndarray
-        if self.to_filter == 'today':
-            mask_time = self.auth_time >= self.today
-        elif self.to_filter == 'tod-1w':
-            mask_time = self.auth_time >= self.tod_1w
-        elif self.to_filter == 'tod-1m':
-            mask_time = self.auth_time >= self.tod_1m
-        elif self.to_filter == 'tod-1y':
-            mask_time = self.auth_time >= self.tod_1y
-
-        w = len(self.auth_time)
-        mask_square = np.triu(np.ones((w, w), dtype=bool), 1)
-        mask_operations = np.ones(int(w**2/2-w/2), dtype=bool)
-
-        # flat with the right way
-        if self.to_filter != None:
-            mask = mask_time & mask_time[:, None]
-            mask_operations = mask_operations & mask[mask_square]
-
-        if np.any(self.filter_abv):
-            mask = self.auth_abv&self.auth_abv[:, None]
-            mask_operations = mask_operations & mask[mask_square]
-
-        if np.any(self.use_special):
-            firstName = 'firstName' ; lastName = 'lastName'
-            firstName_r = 'f_Name_r' ; lastName_r = 'l_Name_r'
+        if side:
+            x_st, x_sp, y_c, self.pb_text = 20, 380, 350, [200, 300]
         else:
-            # First and Last names without special caracters,
-            # removed with unicode.unicode
-            firstName = 'firstName_uc' ; lastName = 'lastName_uc'
-            firstName_r = 'f_Name_uc_r' ; lastName_r = 'l_Name_uc_r'
-
-        if self.to_compare == 'lastname':
-            # Ignore the case if one of the author didn't give its last name
-            # (not seen in my corpus of size 3,734)
-            mask = (self.auth_len_last>0)&(self.auth_len_last[:, None]>0)
-            mask_operations = mask_operations & mask[mask_square]
-
-        elif self.to_compare == 'firstname':
-            # Ignore the case if an author didn't give its first name (i.e.:
-            # organisations, anonymous, some indonesian authors...)
-            mask = (self.auth_len_first>0)&(self.auth_len_first[:, None]>0)
-            mask_operations = mask_operations & mask[mask_square]
-
-        elif self.to_compare == 'bothname':
-            # Ignore the case if an author didn't give its first name (i.e.:
-            # organisations, anonymous, some indonesian authors...)
-            mask = (self.auth_len_last>0)&(self.auth_len_last[:, None]>0)
-            mask_operations = mask_operations & mask[mask_square]
-            mask = (self.auth_len_first>0)&(self.auth_len_first[:, None]>0)
-            mask_operations = mask_operations & mask[mask_square]
-
-        if self.algo == 'Levenshtein' or self.algo == 'DamerauLevenshtein':
-            # for Damerau-Levenshtein, I need to implement a safer parameter
-            # due to transposition matrix test
-            if (self.to_compare == 'firstname'):
-                prescore = np.minimum(
-                    self.auth_len_last[:, None], self.auth_len_last
-                    ) / np.maximum(
-                    self.auth_len_last[:, None], self.auth_len_last)
-
-                mask = prescore > self.treshold
-                pre_d = cdist(self.bag_last, self.bag_last,
-                              metric='cityblock') / 2 / np.maximum(
-                    self.auth_len_last[:, None], self.auth_len_last
-                    ) <= self.treshold
-
-            elif (self.to_compare == 'lastname'):
-                prescore = np.minimum(
-                    self.auth_len_first[:, None], self.auth_len_first
-                    ) / np.maximum(
-                    self.auth_len_first[:, None], self.auth_len_first)
-
-                mask = prescore > self.treshold
-                pre_d = cdist(self.bag_first, self.bag_first,
-                              metric='cityblock') / 2 / np.maximum(
-                    self.auth_len_last[:, None], self.auth_len_last
-                    ) <= self.treshold
-
-            elif (self.to_compare == 'bothname'):
-                prescore_f = np.minimum(
-                    self.auth_len_first[:, None], self.auth_len_first
-                    ) / np.maximum(
-                    self.auth_len_first[:, None], self.auth_len_first)
-
-                prescore_l = np.minimum(
-                    self.auth_len_last[:, None], self.auth_len_last
-                    ) / np.maximum(
-                    self.auth_len_last[:, None], self.auth_len_last)
-
-                pre_f = cdist(self.bag_first, self.bag_first,
-                    metric='cityblock') / 2 / np.maximum(
-                    self.auth_len_first[:, None], self.auth_len_first)
-
-                pre_l = cdist(self.bag_last, self.bag_last,
-                    metric='cityblock') / 2 / np.maximum(
-                    self.auth_len_last[:, None], self.auth_len_last)
-
-                if self.both_comp == 'AND':
-                    mask = (prescore_f > self.treshold)&(
-                            prescore_l > self.treshold)
-
-                    pre_d = (pre_f <= self.treshold)&(pre_l <= self.treshold)
-
-                elif self.both_comp == 'OR':
-                    mask = (prescore_f > self.treshold)|(
-                            prescore_l > self.treshold)
-
-                    pre_d = (pre_f <= self.treshold)|(pre_l <= self.treshold)
-
-                elif self.both_comp == 'AVG':
-                    mask = ((prescore_f+prescore_l)/2) > self.treshold
-                    pre_d = (pre_f + pre_l) / 2 <= self.treshold
-
-            mask_operations = mask_operations & mask[mask_square]
-            mask_operations = mask_operations & pre_d[mask_square]
-
-        # Re-Initialisation
-        self.liste1 = [] ; self.liste2 = [] ; self.light = []
-
-        self.initialize_bar(len(mask_operations))
-        return mask_operations, firstName, lastName, firstName_r, lastName_r
-
-    def update_comparison(self, authkeys_i:str, authkeys_j:str, color:bool
-                          ) -> bool:
-        """
-        Function to add citation keys if asked.
+            x_st, x_sp, y_c, self.pb_text = 110, 1080, 450, [600, 400]
 
-        Parameters
-        ----------
-        authkeys_i : dict
-            First author.
-        authkeys_j : dict
-            Second author.
-        color : bool
-            If the line is white (False) or grey (True).
+        self.cancel_bt = self.cancel_bts[int(side)]
+        self.pb_text = [self.pb_text[0]*self.SCALE,
+                        self.pb_text[1]*self.SCALE]
 
-        Returns
-        -------
-        not color : bool
-            If the line is white (False) or grey (True).
+        self.st_pb = x_st * self.SCALE
+        self.sp_pb = x_sp * self.SCALE
+        self.h_pb = (y_c-20) * self.SCALE
+        self.l_pb = (y_c+20) * self.SCALE
+        self.width_pb = self.sp_pb - self.st_pb
+        self.pb_line = [[self.st_pb, self.h_pb], [self.st_pb, self.l_pb],
+                        [self.sp_pb, self.h_pb], [self.sp_pb, self.l_pb]]
 
+        self.prog_box = np.array([self.st_pb, self.h_pb, 0, 40*self.SCALE])
+        self.pb_rect = [self.st_pb-2, self.pb_text[1]-20*self.SCALE,
+                        self.width_pb+4, self.l_pb+2-self.pb_text[1]
+                        +20*self.SCALE]
+
+    def mark_dirty(self, rect:list=None) -> None:
         """
-        if np.any(self.add_key):
-            # if the better bibtex citation key
-            k1 = self.authors[authkeys_i]['dispkeys']
-            k2 = self.authors[authkeys_j]['dispkeys']
-            l1 = len(k1) ; l2 = len(k2)
-            if l1 == l2:
-                for l in range(l1):
-                    self.liste1.append(k1[l])
-                    self.liste2.append(k2[l])
-                    self.light.append(color)
-
-            elif l1 > l2:
-                for l in range(l1):
-                    self.liste1.append(k1[l])
-                    self.light.append(color)
-                    if l < l2:
-                        self.liste2.append(k2[l])
-                    else:
-                        self.liste2.append(' ')
-
-            elif l1 < l2:
-                for l in range(l2):
-                    self.liste2.append(k2[l])
-                    self.light.append(color)
-                    if l < l1:
-                        self.liste1.append(k1[l])
-                    else:
-                        self.liste1.append(' ')
-
-        self.liste1.append(' ')
-        self.liste2.append(' ')
-        self.light.append(color)
-
-        return not color
-
-    def Levenshtein_distance_es(self, arr_str_1:np.ndarray,
-                                arr_str_2:np.ndarray) -> float:
-        """
-        Levenshtein distance function with treshold based early stoping.
+        Function to ask a redraw of a part of the window at the next frame.
 
         Parameters
         ----------
-        arr_str_1 : np.ndarray
-            First array of the cleaned string from space and dot.
-        arr_str_2 : np.ndarray
-            Second array of the cleaned string from space and dot.
-
-        Returns
-        -------
-        float
-            Levenshtein distance with 1.0 when early stoping is triggered.
+        rect : list, optional
+            Area (x, y, width, height) to redraw. The default is None (whole
+            window).
 
         """
-        # self.treshold is a float (and not a np.float64)
-        dist = distances.Levenshtein_distance_es(arr_str_1, arr_str_2,
-                                                 self.treshold)
-
-        return dist
+        if rect is None:
+            self.full_redraw = True
+        else:
+            self.dirty_rects.append(pygame.Rect(rect))
 
-    def Damerau_Levenshtein_distance_es(self, arr_str_1:np.ndarray,
-                                        arr_str_2:np.ndarray) -> float:
+    def post_progress(self, index:int, total:int) -> bool:
         """
-        Damerau-Levenshtein distance function with early stoping.
+        Progression callback of the engine, called from the worker thread:
+        send the progression to the interface.
 
         Parameters
         ----------
-        arr_str_1 : np.ndarray
-            First cleaned string from space and dot.
-        arr_str_2 : np.ndarray
-            Secind cleaned string from space and dot.
+        index : int
+            Current iteration.
+        total : int
+            Total number of iteration expected.
 
         Returns
         -------
-        float
-            Damerau-Levenshtein distance with 1.0 if the early stoping is
-            triggered.
+        bool
+            If the engine phase must be cancelled (True) or not (False).
 
         """
-        dist = distances.Damerau_Levenshtein_distance_es(arr_str_1, arr_str_2,
-                                                         self.treshold)
-
-        return dist
+        self.worker_queue.put(('progress', index, total))
+        return self.cancel_event.is_set()
 
-    def record_matching(self, val_a1:str, val_a2:str, val_b1:str, val_b2:str,
-                        color:bool) -> None:
+    def run_in_worker(self, state:str, task, finish) -> None:
         """
-        Function to append matching results into the comparison list.
+        Function to start a long phase in the worker thread, the interface
+        keeps running and shows the waiting screen of `state`.
 
         Parameters
         ----------
-        val_a1 : str
-            First part of the author name. Can be first or last name.
-        val_a2 : str
-            Second part of the author name. Can be first or last name.
-        val_b1 : str
-            First part of the author name. Can be first or last name.
-        val_b2 : str
-            Second part of the author name. Can be first or last name.
-        color : bool
-            If the background line is white (False) or grey (True).
+        state : str
+            State during the phase (key of waiting_messages).
+        task : callable
+            Phase to run, called without arguments in the worker thread.
+        finish : callable
+            Called in the interface thread with the task result once done.
 
         """
-        self.liste1.append(val_a1+', '+val_a2)
-        self.liste2.append(val_b1+', '+val_b2)
-        self.light.append(color)
+        if self.worker is not None:
+            # one phase at a time
+            return
+
+        self.state = state
+        self.m_text = False
+        self.prog_bar = False
+        # the comparison results are shown while they are found
+        self.set_progress_layout(state in self.live_states)
+        self.cancel_event.clear()
+        self.mark_dirty()
+        self.worker = threading.Thread(target=self.worker_main,
+                                       args=(task, finish), daemon=True)
+
+        self.worker.start()
 
-    def comparison_matching(self, app) -> None:
+    def worker_main(self, task, finish) -> None:
         """
-        Function to compute the comparison between each authors pair.
+        Body of the worker thread: run the task and send its result (or
+        exception) to the interface.
 
         Parameters
         ----------
-        app : Manager(DataGest)
-            Manager class to get the other attributes.
+        task : callable
+            Phase to run.
+        finish : callable
+            Given back with the result, see run_in_worker.
 
         """
-        # Global precomputing
-        (mask_operations, firstName_rpr, lastName_rpr, firstName_cp,
-         lastName_cp) = self.preparation_matching()
-
-        if self.algo == 'Perfect':
-            firstName_cp = firstName_rpr
-            lastName_cp  = lastName_rpr
-            is_match = lambda a, b: a == b
-
+        try:
+            result = task()
+        except Exception as error:
+            self.worker_queue.put(('error', finish, error))
         else:
-            if self.algo == 'Levenshtein':
-                # for optimisation use early stoping when treshold <= 0.78
-                if self.treshold > 0.78:
-                    f_dist = distances.Levenshtein_distance
-                else:
-                    f_dist = self.Levenshtein_distance_es
-    
-            elif self.algo == 'DamerauLevenshtein':
-                # for optimisation use early stoping when treshold <= 0.79
-                if self.treshold > 0.79:
-                    f_dist = distances.Damerau_Levenshtein_distance
-                else:
-                    f_dist = self.Damerau_Levenshtein_distance_es
-
-            is_match = lambda a, b: f_dist(a, b) <= self.treshold
-
-        color = False ; stop = False ; t = pygame.time.get_ticks()
-        authkeys = np.sort(list(self.authors.keys()))
-        num_aut = len(authkeys)
-        app.draw()
-        for i in range(num_aut-1):
-            auth_1 = self.authors[authkeys[i]]
-            for j in range(i+1, num_aut):
-                auth_2 = self.authors[authkeys[j]]
-                same = False
-                if mask_operations[self.index]:
-                    # Last / First name comparison
-                    if self.to_compare == 'lastname':
-                        if is_match(auth_1[lastName_cp], auth_2[lastName_cp]):
-                            same = True
-                            self.record_matching(
-                                auth_1[lastName_rpr], auth_1[firstName_rpr],
-                                auth_2[lastName_rpr], auth_2[firstName_rpr],
-                                color)
-
-                    elif self.to_compare == 'firstname':
-                        if is_match(auth_1[firstName_cp],
-                                    auth_2[firstName_cp]):
-                            same = True
-                            self.record_matching(
-                                auth_1[firstName_rpr], auth_1[lastName_rpr],
-                                auth_2[firstName_rpr], auth_2[lastName_rpr],
-                                color)
-
-                    elif self.to_compare == 'bothname':
-                        d_l = f_dist(auth_1[lastName_cp], auth_2[lastName_cp])
-                        d_f = f_dist(auth_1[firstName_cp],
-                                     auth_2[firstName_cp])
-
-                        if self.both_comp == 'AND':
-                            # if one or two True == 1.0, else == 0.0
-                            d = float((d_l > self.treshold) or
-                                      (d_f > self.treshold))
-
-                        elif self.both_comp == 'OR':
-                            d = float((d_l > self.treshold) and
-                                      (d_f > self.treshold))
-
-                        elif self.both_comp == 'AVG':
-                            d = (d_l+d_f)/2
-
-                        if d <= self.treshold:
-                            same = True
-                            self.record_matching(
-                                auth_1[lastName_rpr], auth_1[firstName_rpr],
-                                auth_2[lastName_rpr], auth_2[firstName_rpr],
-                                color)
-
-                if same:
-                    color = self.update_comparison(authkeys[i], authkeys[j],
-                                                   color)
-
-                self.index += 1
-                if pygame.time.get_ticks() - t > self.refresh_rate:
-                    t = pygame.time.get_ticks()
-                    self.prog_box[2] = self.index * self.width_pb
-                    app.draw()
-                    stop = self.quit_in_loop(app)
-                    if stop:
-                        break
-
-            if stop:
-                break
-
-        self.prog_bar = False
+            self.worker_queue.put(('done', finish, result))
 
-    def export_comparaison(self) -> None:
+    def drain_worker(self) -> None:
         """
-        Function to save the computed comparison in a csv file.
+        Function called at each frame to apply the messages of the worker
+        thread: progression bar updates, new comparison results and end of
+        the phase.
         """
-        df = pd.DataFrame()
-        df['liste_1'] = self.liste1
-        df['liste_2'] = self.liste2
-        if self.to_path != '':
-            df.to_csv(self.to_path / 'exported_comparison.csv', index=False)
+        while True:
+            try:
+                message = self.worker_queue.get_nowait()
+            except queue.Empty:
+                break
 
-    def export_db2json(self) -> None:
-        """
-        Function to save the used database into json file.
-        """
-        if len(self.papers) <= 0:
-            self.state = 'ERROR'
-            self.error_type = 'no compil'
-            
-        else:
-            # Compute time filtering using numpy.ndarray
-            if self.to_filter == 'today':
-                mask_time = self.auth_time >= self.today
-            elif self.to_filter == 'tod-1w':
-                mask_time = self.auth_time >= self.tod_1w
-            elif self.to_filter == 'tod-1m':
-                mask_time = self.auth_time >= self.tod_1m
-            elif self.to_filter == 'tod-1y':
-                mask_time = self.auth_time >= self.tod_1y
-
-            self.papers_save = {}
-            keys = list(self.papers.keys())
-            if self.to_filter != None:
-                for i in range(len(keys)):
-                    if mask_time[i]:
-                        paper = self.papers[keys[i]]
-                        self.papers_save[keys[i]] = {}
-                        self.papers_save[keys[i]]['title'] = self.papers[
-                            keys[i]]['title']
-
-                        self.papers_save[keys[i]]['added_date'] = str(
-                            self.papers[keys[i]]['date'])[2:-2]
-
-                        self.papers_save[keys[i]]['lastName'] = self.papers[
-                            keys[i]]['lastName']
-
-                        self.papers_save[keys[i]]['firstName'] = self.papers[
-                            keys[i]]['firstName']
+            if message[0] == 'progress':
+                if message[1] == 0:
+                    self.initialize_bar(message[2])
+                else:
+                    self.prog_box[2] = message[1] * self.width_pb
 
-            else:
-                for i in range(len(keys)):
-                    paper = self.papers[keys[i]]
-                    self.papers_save[keys[i]] = {}
-                    self.papers_save[keys[i]]['title'] = self.papers[
-                        keys[i]]['title']
+                self.mark_dirty(self.pb_rect)
 
-                    self.papers_save[keys[i]]['added_date'] = str(
-                        self.papers[keys[i]]['date'])[2:-2]
+            else:
+                self.worker.join()
+                self.worker = None
+                self.prog_bar = False
+                self.mark_dirty()
+                if message[0] == 'error':
+                    self.worker_error(message[1], message[2])
+                else:
+                    message[1](message[2])
 
-                    self.papers_save[keys[i]]['lastName'] = self.papers[
-                        keys[i]]['lastName']
+        if (self.state in self.live_states) and (
+                self.num_rows != self.scroller.n_line):
+            # new results found by the worker
+            self.scroller.initialise_scroller(self)
+            self.mark_dirty(self.box_tx)
 
-                    self.papers_save[keys[i]]['firstName'] = self.papers[
-                        keys[i]]['firstName']
+    def worker_error(self, finish, error:Exception) -> None:
+        """
+        Function to end a phase stopped by an error in the worker thread: it
+        ends as if cancelled and the error is shown instead of closing the
+        window (the traceback is printed in the terminal).
 
-            try:
-                with open(self.to_path / 'exported_db.json', "w",
-                          encoding="utf-8") as file:
+        Parameters
+        ----------
+        finish : callable
+            End of the phase, see run_in_worker.
+        error : Exception
+            Raised exception.
 
-                    json.dump(self.papers_save, file, indent=4)
+        """
+        traceback.print_exception(type(error), error, error.__traceback__)
+        if self.state == 'COMPUTING':
+            # a partial compilation can not be compared
+            self.reset_model()
+
+        finish(False)
+        text = type(error).__name__+': '+str(error)
+        if len(text) > 60:
+            text = text[:57]+'...'
+
+        self.error_messages['worker']['text'][1] = text
+        self.m_text = False
+        self.state = 'ERROR'
+        self.error_type = 'worker'
+
+    def cancel_worker(self) -> None:
+        """
+        Function of the Cancel button: the running phase stops at its next
+        progression report.
+        """
+        self.cancel_event.set()
 
-            except IOError as e:
-                print(f"Error saving dictionary: {e}")
+    def stop_worker(self) -> None:
+        """
+        Function to cancel the running phase and wait for its end (when the
+        application is closed).
+        """
+        if self.worker is not None:
+            self.cancel_event.set()
+            self.worker.join()
+            self.worker = None
 
-    def quit_in_loop(self, app):
+    def fit_text(self, text:str) -> str:
         """
-        Function to be able to terminate the program without passing by
-        comand killing process.
+        Function to shorten a text (i.e. a citation key) so it fits in a
+        column of the comparison pannel. The longest fitting start is found
+        by dichotomy on the measured width, and kept for the next frames.
 
         Parameters
         ----------
-        app : Manager(DataGest)
-            Manager class to get the other attributes.
+        text : str
+            Text to show.
 
         Returns
         -------
-        stop : bool
-            If the loop con continue (False) or not (True).
+        str
+            Shown text.
 
         """
-        stop = False
-        for event in pygame.event.get():
-            # Click handling (ignoring wheel as click)
-            if event.type == pygame.QUIT:
-                app.run = False
-                stop = True
-                break
+        if text in self.fit_cache:
+            return self.fit_cache[text]
+
+        if self.TEXT_FONT.size(text)[0] < self.TXT_LEN[1]:
+            shown = text
+        else:
+            # text[:low] fits, text[:high] does not
+            low = 0 ; high = len(text)
+            while high-low > 1:
+                mid = (low+high)//2
+                if self.TEXT_FONT.size(text[:mid])[0] <= self.TXT_LEN[0]:
+                    low = mid
+                else:
+                    high = mid
+
+            shown = text[:low]+'...'
 
-        return stop
+        self.fit_cache[text] = shown
+        return shown
@@ -1,9 +1,30 @@
 
 import numpy as np
-from numba import njit
-
-
-@njit(cache=True)
+from numba import njit, prange, config
+
+# The parallel kernels are launched from the worker thread of the interface,
+# after that the TBB threading layer prevents the process from exiting
+config.THREADING_LAYER_PRIORITY = ['omp', 'workqueue', 'tbb']
+
+# Explicit signatures of the comparison kernels: names as characters code
+# (uint32), boundaries and pairs in int64, int32 workspace. They are
+# compiled (or read from the numba cache) when this module is imported and
+# never at the first comparison.
+NAME = 'uint32[::1]'
+WORK = 'int32[:, ::1]'
+SIG_WS = f'float64({NAME}, {NAME}, float64, {WORK})'
+SIG_FIELD = f'float64({NAME}, {NAME}, float64, boolean, {WORK})'
+SIG_BOTH = (f'float64({NAME}, {NAME}, {NAME}, {NAME}, float64, int64, '
+            f'boolean, {WORK})')
+SIG_BATCH = (f'float64[::1]({NAME}, int64[::1], int64[::1], int64[::1], '
+             'float64, boolean, int64)')
+SIG_BATCH_BOTH = (f'float64[::1]({NAME}, int64[::1], {NAME}, int64[::1], '
+                  'int64[::1], int64[::1], float64, int64, boolean, int64)')
+SIG_INITIALS = (f'boolean({NAME}, int64[::1], boolean[::1], {NAME}, '
+                'int64[::1], boolean[::1])')
+
+
+@njit(cache=True, nogil=True)
 def Levenshtein_distance(arr_str_1:np.ndarray, arr_str_2:np.ndarray
                          ) -> float:
     """
@@ -39,7 +60,7 @@ def Levenshtein_distance(arr_str_1:np.ndarray, arr_str_2:np.ndarray
 
     return prev_row[len2]/max(len1, len2)
 
-@njit(cache=True)
+@njit(cache=True, nogil=True)
 def Levenshtein_distance_es(arr_str_1:np.ndarray, arr_str_2:np.ndarray,
                             treshold:float) -> float:
     """
@@ -81,7 +102,7 @@ def Levenshtein_distance_es(arr_str_1:np.ndarray, arr_str_2:np.ndarray,
     final_dist = prev_row[len2]
     return final_dist/max_len
 
-@njit(cache=True)
+@njit(cache=True, nogil=True)
 def Damerau_Levenshtein_distance(arr_str_1:np.ndarray, arr_str_2:np.ndarray
                                  ) -> float:
     """
@@ -124,7 +145,7 @@ def Damerau_Levenshtein_distance(arr_str_1:np.ndarray, arr_str_2:np.ndarray
 
     return prev_row[len2]/max(len1, len2)
 
-@njit(cache=True)
+@njit(cache=True, nogil=True)
 def Damerau_Levenshtein_distance_es(arr_str_1:np.ndarray,
                                     arr_str_2:np.ndarray,
                                     treshold:float) -> float:
@@ -172,3 +193,419 @@ def Damerau_Levenshtein_distance_es(arr_str_1:np.ndarray,
         prev_row[:] = curr_row[:]
 
     return prev_row[len2]/max(len1, len2)
+
+@njit(SIG_WS, cache=True, nogil=True)
+def Levenshtein_distance_ws(arr_str_1:np.ndarray, arr_str_2:np.ndarray,
+                            treshold:float, work:np.ndarray) -> float:
+    """
+    Levenshtein distance computed on integers in a preallocated workspace,
+    with treshold based early stoping. The rows are rotated instead of
+    copied.
+
+    Parameters
+    ----------
+    arr_str_1 : np.ndarray
+        First array of the cleaned string from space and dot.
+    arr_str_2 : np.ndarray
+        Second array of the cleaned string from space and dot.
+    treshold : float
+        Maximum distance of interest, no early stoping if >= 1.
+    work : np.ndarray
+        Integer workspace of shape (>= 2, > longest string length).
+
+    Returns
+    -------
+    float
+        Levenshtein distance with 1.0 when early stoping is triggered.
+
+    """
+    if len(arr_str_1) < len(arr_str_2):
+        arr_str_1, arr_str_2 = arr_str_2, arr_str_1
+
+    len1, len2 = len(arr_str_1), len(arr_str_2)
+    if len1 == 0:
+        return 0.0
+
+    # Integer edit budget, the tolerance keeps the pairs sitting on a
+    # treshold computed in float (e.g. 2*0.6-1.0 = 0.1999...)
+    max_dist = np.floor(treshold*len1+1e-9)
+    prev, curr = 0, 1
+    for j in range(len2+1):
+        work[prev, j] = j
+
+    for i in range(1, len1+1):
+        work[curr, 0] = i
+        row_min = i
+        char_1 = arr_str_1[i-1]
+        for j in range(1, len2+1):
+            cost = 0 if char_1 == arr_str_2[j-1] else 1
+            value = min(work[curr, j-1]+1, work[prev, j]+1,
+                        work[prev, j-1]+cost)
+
+            work[curr, j] = value
+            if value < row_min:
+                row_min = value
+
+        if row_min > max_dist:
+            return 1.0
+
+        prev, curr = curr, prev
+
+    return work[prev, len2]/len1
+
+@njit(SIG_WS, cache=True, nogil=True)
+def Damerau_Levenshtein_distance_ws(arr_str_1:np.ndarray,
+                                    arr_str_2:np.ndarray, treshold:float,
+                                    work:np.ndarray) -> float:
+    """
+    Damerau-Levenshtein distance computed on integers in a preallocated
+    workspace, with treshold based early stoping. The rows are rotated
+    instead of copied.
+
+    Parameters
+    ----------
+    arr_str_1 : np.ndarray
+        First cleaned string from space and dot.
+    arr_str_2 : np.ndarray
+        Second cleaned string from space and dot.
+    treshold : float
+        Maximum distance of interest, no early stoping if >= 1.
+    work : np.ndarray
+        Integer workspace of shape (3, > longest string length).
+
+    Returns
+    -------
+    float
+        Damerau-Levenshtein distance with 1.0 when early stoping is
+        triggered.
+
+    """
+    if len(arr_str_1) < len(arr_str_2):
+        arr_str_1, arr_str_2 = arr_str_2, arr_str_1
+
+    len1, len2 = len(arr_str_1), len(arr_str_2)
+    if len1 == 0:
+        return 0.0
+
+    # Integer edit budget, the tolerance keeps the pairs sitting on a
+    # treshold computed in float (e.g. 2*0.6-1.0 = 0.1999...)
+    max_dist = np.floor(treshold*len1+1e-9)
+    prev_m2, prev, curr = 2, 0, 1
+    for j in range(len2+1):
+        work[prev, j] = j
+
+    for i in range(1, len1+1):
+        work[curr, 0] = i
+        row_min = i
+        char_1 = arr_str_1[i-1]
+        for j in range(1, len2+1):
+            # Cost of substitution
+            cost = 0 if char_1 == arr_str_2[j-1] else 1
+            value = min(work[curr, j-1]+1, work[prev, j]+1,
+                        work[prev, j-1]+cost)
+
+            if (i > 1) and (j > 1) and (char_1 == arr_str_2[j-2]) and (
+                arr_str_1[i-2] == arr_str_2[j-1]):
+                value = min(value, work[prev_m2, j-2]+cost)
+
+            work[curr, j] = value
+            if value < row_min:
+                row_min = value
+
+        if (row_min-1) > max_dist:
+            return 1.0
+
+        prev_m2, prev, curr = prev, curr, prev_m2
+
+    return work[prev, len2]/len1
+
+@njit(SIG_FIELD, cache=True, nogil=True)
+def Field_distance(arr_str_1:np.ndarray, arr_str_2:np.ndarray,
+                   treshold:float, damerau:bool, work:np.ndarray) -> float:
+    """
+    Levenshtein or Damerau-Levenshtein distance of one name field, with
+    early stoping.
+
+    Parameters
+    ----------
+    arr_str_1 : np.ndarray
+        First array of the cleaned string from space and dot.
+    arr_str_2 : np.ndarray
+        Second array of the cleaned string from space and dot.
+    treshold : float
+        Maximum distance of interest.
+    damerau : bool
+        If the Damerau-Levenshtein distance is used.
+    work : np.ndarray
+        Integer workspace of shape (3, > longest string length).
+
+    Returns
+    -------
+    float
+        Distance, 1.0 when early stoping is triggered.
+
+    """
+    if damerau:
+        return Damerau_Levenshtein_distance_ws(arr_str_1, arr_str_2,
+                                               treshold, work)
+
+    return Levenshtein_distance_ws(arr_str_1, arr_str_2, treshold, work)
+
+@njit(SIG_BOTH, cache=True, nogil=True)
+def Both_name_distance(last_1:np.ndarray, last_2:np.ndarray,
+                       first_1:np.ndarray, first_2:np.ndarray,
+                       treshold:float, mode:int, damerau:bool,
+                       work:np.ndarray) -> float:
+    """
+    Fused last and first name distance. The last names are compared first
+    and the first names are computed with the budget they are left: under
+    AND a failing last name is enough, under OR a matching one bounds the
+    first name distance. Under AVG the first name is computed with the budget left by
+    the last name distance.
+
+    Parameters
+    ----------
+    last_1 : np.ndarray
+        Last name of the first author, cleaned from space and dot.
+    last_2 : np.ndarray
+        Last name of the second author, cleaned from space and dot.
+    first_1 : np.ndarray
+        First name of the first author, cleaned from space and dot.
+    first_2 : np.ndarray
+        First name of the second author, cleaned from space and dot.
+    treshold : float
+        Maximum distance under which the authors are the same.
+    mode : int
+        How both distances are combined: 0 for AND, 1 for OR and 2 for AVG.
+    damerau : bool
+        If the Damerau-Levenshtein distance is used.
+    work : np.ndarray
+        Integer workspace of shape (3, > longest string length).
+
+    Returns
+    -------
+    float
+        Largest (AND) or smallest (OR) of both distances, or their average
+        (AVG), 1.0 when the authors are not the same.
+
+    """
+    if mode == 2:
+        # the average can only be under the treshold if the last name
+        # distance is under twice the treshold
+        budget = min(2*treshold, 1.0)
+        d_l = Field_distance(last_1, last_2, budget, damerau, work)
+        if d_l > budget:
+            return 1.0
+
+        budget = min(2*treshold-d_l, 1.0)
+        d_f = Field_distance(first_1, first_2, budget, damerau, work)
+        return (d_l+d_f)/2
+
+    d_l = Field_distance(last_1, last_2, treshold, damerau, work)
+    if mode == 0:
+        if d_l > treshold:
+            return 1.0
+
+        d_f = Field_distance(first_1, first_2, treshold, damerau, work)
+        if d_f > treshold:
+            return 1.0
+
+        return max(d_l, d_f)
+
+    if d_l <= treshold:
+        # matching already, the first name can only lower the distance
+        return min(d_l, Field_distance(first_1, first_2, d_l, damerau,
+                                       work))
+
+    d_f = Field_distance(first_1, first_2, treshold, damerau, work)
+    if d_f > treshold:
+        return 1.0
+
+    return d_f
+
+@njit(SIG_BATCH, cache=True, nogil=True, parallel=True)
+def Batch_distances(codes:np.ndarray, offsets:np.ndarray,
+                    idx_1:np.ndarray, idx_2:np.ndarray, treshold:float,
+                    damerau:bool, chunk:int) -> np.ndarray:
+    """
+    Distances of a batch of name pairs. The pairs are split into chunks run
+    in parallel, each chunk reusing one integer workspace.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        Concatenated characters code of all the names.
+    offsets : np.ndarray
+        Names boundaries in codes, name k is codes[offsets[k]:offsets[k+1]].
+    idx_1 : np.ndarray
+        Index of the first name of each pair.
+    idx_2 : np.ndarray
+        Index of the second name of each pair.
+    treshold : float
+        Maximum distance of interest.
+    damerau : bool
+        If the Damerau-Levenshtein distance is used.
+    chunk : int
+        Number of pairs per chunk.
+
+    Returns
+    -------
+    dist : np.ndarray
+        Distance of each pair, 1.0 when early stoping is triggered.
+
+    """
+    num = len(idx_1)
+    dist = np.empty(num, dtype=np.float64)
+    width = 1
+    for k in range(len(offsets)-1):
+        width = max(width, offsets[k+1]-offsets[k]+1)
+
+    n_chunk = (num+chunk-1)//chunk
+    for c in prange(n_chunk):
+        work = np.empty((3, width), dtype=np.int32)
+        for k in range(c*chunk, min(num, (c+1)*chunk)):
+            a, b = idx_1[k], idx_2[k]
+            dist[k] = Field_distance(codes[offsets[a]:offsets[a+1]],
+                                     codes[offsets[b]:offsets[b+1]],
+                                     treshold, damerau, work)
+
+    return dist
+
+@njit(SIG_BATCH_BOTH, cache=True, nogil=True, parallel=True)
+def Batch_both_name_distances(codes_l:np.ndarray, offsets_l:np.ndarray,
+                              codes_f:np.ndarray, offsets_f:np.ndarray,
+                              idx_1:np.ndarray, idx_2:np.ndarray,
+                              treshold:float, mode:int, damerau:bool,
+                              chunk:int) -> np.ndarray:
+    """
+    Both name distances (see Both_name_distance) of a batch of authors
+    pairs, run in parallel chunks each reusing one integer workspace.
+
+    Parameters
+    ----------
+    codes_l : np.ndarray
+        Concatenated characters code of all the last names.
+    offsets_l : np.ndarray
+        Last names boundaries in codes_l.
+    codes_f : np.ndarray
+        Concatenated characters code of all the first names.
+    offsets_f : np.ndarray
+        First names boundaries in codes_f.
+    idx_1 : np.ndarray
+        Index of the first author of each pair.
+    idx_2 : np.ndarray
+        Index of the second author of each pair.
+    treshold : float
+        Maximum distance under which the authors are the same.
+    mode : int
+        How both distances are combined: 0 for AND, 1 for OR and 2 for AVG.
+    damerau : bool
+        If the Damerau-Levenshtein distance is used.
+    chunk : int
+        Number of pairs per chunk.
+
+    Returns
+    -------
+    dist : np.ndarray
+        Combined distance of each pair.
+
+    """
+    num = len(idx_1)
+    dist = np.empty(num, dtype=np.float64)
+    width = 1
+    for k in range(len(offsets_l)-1):
+        width = max(width, offsets_l[k+1]-offsets_l[k]+1,
+                    offsets_f[k+1]-offsets_f[k]+1)
+
+    n_chunk = (num+chunk-1)//chunk
+    for c in prange(n_chunk):
+        work = np.empty((3, width), dtype=np.int32)
+        for k in range(c*chunk, min(num, (c+1)*chunk)):
+            a, b = idx_1[k], idx_2[k]
+            dist[k] = Both_name_distance(
+                codes_l[offsets_l[a]:offsets_l[a+1]],
+                codes_l[offsets_l[b]:offsets_l[b+1]],
+                codes_f[offsets_f[a]:offsets_f[a+1]],
+                codes_f[offsets_f[b]:offsets_f[b+1]],
+                treshold, mode, damerau, work)
+
+    return dist
+
+@njit(SIG_INITIALS, cache=True, nogil=True)
+def Initials_compatible(codes_1:np.ndarray, offs_1:np.ndarray,
+                        ini_1:np.ndarray, codes_2:np.ndarray,
+                        offs_2:np.ndarray, ini_2:np.ndarray) -> bool:
+    """
+    Tell if two tokenized first names can be the same person, where an
+    initial token ("R.") stands for any full token starting with it
+    ("Robert"). Tokens of the shortest name must be found in order in the
+    longest one (middle names can be missing), and both first tokens must
+    be compatible. Linear time in the total number of characters.
+
+    Parameters
+    ----------
+    codes_1 : np.ndarray
+        Concatenated character codes of the tokens of the first name.
+    offs_1 : np.ndarray
+        Token boundaries in codes_1, of length number of tokens + 1.
+    ini_1 : np.ndarray
+        If each token of the first name is an initial.
+    codes_2 : np.ndarray
+        Concatenated character codes of the tokens of the second name.
+    offs_2 : np.ndarray
+        Token boundaries in codes_2, of length number of tokens + 1.
+    ini_2 : np.ndarray
+        If each token of the second name is an initial.
+
+    Returns
+    -------
+    bool
+        True if the first names are compatible.
+
+    """
+    n_1, n_2 = len(ini_1), len(ini_2)
+    if n_1 > n_2:
+        return Initials_compatible(codes_2, offs_2, ini_2, codes_1, offs_1,
+                                   ini_1)
+
+    if n_1 == 0:
+        return False
+
+    # greedy subsequence search of the tokens of name 1 into name 2
+    k = 0
+    for t in range(n_2):
+        if k == n_1:
+            break
+
+        st_1, sp_1 = offs_1[k], offs_1[k+1]
+        st_2, sp_2 = offs_2[t], offs_2[t+1]
+        len_1, len_2 = sp_1-st_1, sp_2-st_2
+        if ini_1[k] and ini_2[t]:
+            # the shortest initial must be a prefix of the other one
+            n_c = min(len_1, len_2)
+            compatible = True
+        elif ini_1[k]:
+            # the initial must be a prefix of the full token
+            n_c = len_1
+            compatible = len_1 <= len_2
+        elif ini_2[t]:
+            n_c = len_2
+            compatible = len_2 <= len_1
+        else:
+            # two full tokens must be identical
+            n_c = len_1
+            compatible = len_1 == len_2
+
+        if compatible:
+            for c in range(n_c):
+                if codes_1[st_1+c] != codes_2[st_2+c]:
+                    compatible = False
+                    break
+
+        if compatible:
+            k += 1
+        elif t == 0:
+            # the given names must correspond
+            return False
+
+    return k == n_1
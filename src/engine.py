@@ -0,0 +1,2304 @@
+
+from __future__ import annotations
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import importlib
+import threading
+import numpy as np
+import configparser
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_right
+from time import time, perf_counter
+from pathlib import Path
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+class Lazy_module:
+    """
+    Module imported at the first access to one of its attributes, to keep
+    the heavy libraries out of the start of the application.
+
+    Parameters
+    ----------
+    name : str
+        Full name of the module (i.e. 'scipy.sparse').
+
+    """
+    __slots__ = ('name', 'module')
+
+    def __init__(self, name:str):
+        self.name = name
+        self.module = None
+
+    def __getattr__(self, attribute:str):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+
+        return getattr(self.module, attribute)
+
+pd = Lazy_module('pandas')
+sparse = Lazy_module('scipy.sparse')
+csgraph = Lazy_module('scipy.sparse.csgraph')
+# Special characters removal
+unidecode = Lazy_module('unidecode')
+# For string distances (numba)
+distances = Lazy_module('distances')
+# Sharded batch comparison of the candidate pairs
+parallel = Lazy_module('parallel')
+
+# Tables and columns read in low memory mode, the only ones used by the
+# compilation (Zotero and Better BibTeX databases), in their reading order
+COMPILE_COLUMNS = {
+    'fields': ['fieldID', 'fieldName'],
+    'itemAttachments': ['itemID', 'parentItemID'],
+    'items': ['itemID', 'clientDateModified', 'key'],
+    'itemData': ['itemID', 'fieldID', 'valueID'],
+    'itemDataValues': ['valueID', 'value'],
+    'itemCreators': ['itemID', 'creatorID'],
+    'creators': ['creatorID', 'firstName', 'lastName'],
+    'citationkey': ['citationKey', 'itemID', 'itemKey']}
+
+# fieldID of the documents title in itemData
+TITLE_FIELD = 1
+
+class Paper_record:
+    """
+    View on one compiled document of an Engine, the data staying in the
+    engine columns.
+
+    Parameters
+    ----------
+    engine : Engine
+        Engine holding the compiled documents.
+    index : int
+        Index of the document.
+
+    """
+    __slots__ = ('engine', 'index')
+
+    def __init__(self, engine, index:int):
+        self.engine = engine
+        self.index = index
+
+    @property
+    def key(self) -> str:
+        """Better BibTeX citation key."""
+        return self.engine.paper_keys[self.index]
+
+    @property
+    def title(self) -> str:
+        """Title of the document ('' if none)."""
+        return self.engine.paper_title[self.index]
+
+    @property
+    def date(self) -> np.datetime64:
+        """When the document was created in Zotero."""
+        return self.engine.paper_date[self.index]
+
+    @property
+    def authors(self) -> np.ndarray:
+        """Authors id, in the creators order."""
+        ptr = self.engine.paper_ptr
+        return self.engine.paper_auth[ptr[self.index]:ptr[self.index+1]]
+
+    @property
+    def firstName(self) -> list:
+        """First name of the authors."""
+        return list(self.engine.auth_names['firstName'][self.authors])
+
+    @property
+    def lastName(self) -> list:
+        """Last name of the authors."""
+        return list(self.engine.auth_names['lastName'][self.authors])
+
+class Author_record:
+    """
+    View on one compiled author of an Engine, the data staying in the
+    engine columns.
+
+    Parameters
+    ----------
+    engine : Engine
+        Engine holding the compiled authors.
+    index : int
+        Id of the author.
+
+    """
+    __slots__ = ('engine', 'index')
+
+    def __init__(self, engine, index:int):
+        self.engine = engine
+        self.index = index
+
+    def __getitem__(self, field:str):
+        """Name field of the author, see Engine.author_field."""
+        return self.engine.author_field(field, self.index)
+
+    @property
+    def key(self) -> str:
+        """Author key 'last, first'."""
+        return self.engine.auth_keys[self.index]
+
+    @property
+    def date(self) -> np.datetime64:
+        """Creation date of its last document."""
+        return self.engine.auth_time[self.index]
+
+    @property
+    def papers(self) -> np.ndarray:
+        """Index of its documents."""
+        ptr = self.engine.auth_ptr
+        return self.engine.auth_paper[ptr[self.index]:ptr[self.index+1]]
+
+    @property
+    def citekeys(self) -> list:
+        """Citation keys of its documents."""
+        return list(self.engine.paper_keys[self.papers])
+
+class Engine:
+    """
+    Matching engine independent from the user interface:
+        - Snapshot and loading of the SQLite Zotero/Better-BibTeX databases.
+        - Compilation of the papers and authors via Pandas and NumPy.
+        - Authors comparison and exports.
+
+    The long phases report their progression through `progress`, a callable
+    taking the current index and the total number of iterations and
+    returning True to cancel the phase.
+
+    Parameters
+    ----------
+    progress : callable, optional
+        Progression callback: progress(index:int, total:int) -> bool. The
+        default is None (no report, no cancellation).
+    config_path : str | Path, optional
+        Access path to the ini file giving the database paths and the
+        comparison settings. The default is 'main.ini'.
+
+    """
+
+    def __init__(self, progress=None, config_path:str='main.ini'):
+        # --- Progression report ---
+        self.progress = progress
+        self.config_path = config_path
+        # minimum time between two reports in milliseconds
+        self.refresh_rate = 120
+        self.index = 0           # Current iteration of the long phase
+        self.tot_idx = 1         # Total number of iteration of the phase
+        self.t_progress = 0.     # Time of the last report
+
+        # --- Gestion de l'État ---
+        self.state = 'IDLE'  # IDLE, LOADING, COMPUTING, ERROR, etc.
+        self.error_type = '' # For the error type gestion
+        self.comp_st = 0     # Compilation state (0: empty, 1: loaded,
+        #                       2: compiled)
+
+        # --- Paths and files ---
+        self.from_path = '' # origin path of the databse
+        self.to_path = ''   # path where to copy the database
+
+        # --- Data structur ---
+        self.data = {}             # raw Zotero tables
+        self.data_cite_key = {}    # Better-BibTeX citation keys
+        self.one_loaded = False    # True if db has been successfully loaded
+        self.use_zotero_db = False # Better-BibTex and zotero db has fused
+
+        # compiled documents and authors, in columns (see reset_model)
+        self.reset_model()
+        self.num_elem = 0     # Total number of documents
+
+        # --- Comparison parameters ---
+        self.algo = None       # Perfect, Levenshtein, DamerauLevenshtein
+        self.to_compare = None # 'lastname', 'firstname' or 'bothname'
+        self.to_filter = None  # 'today', 'tod-1w', etc.
+        self.treshold = 0.10   # treshold value for distance based algorithm
+
+        self.use_special = np.array([False]) # Keep or not the accents
+        self.filter_abv = np.array([False])  # Use only or not abreviations
+        self.add_key = np.array([False])     # Render citation keys
+        self.both_comp = 'AND' # how both name distance will be handle
+        # both_comp code for distances.Both_name_distance
+        self.both_modes = {'AND':0, 'OR':1, 'AVG':2}
+
+        # --- Comparison sharding (COMPUTE section of the ini file) ---
+        self.shards = 1         # worker processes, 1 to stay in process
+        self.chunk_size = 20000 # candidate pairs per shard
+        # only read the needed columns and release the tables once compiled
+        self.low_memory = False
+        self.read_chunk = 50000 # rows per reading in low memory mode
+        self.load_threads = 4   # tables read at the same time (1: in turn)
+        self.load_time = None   # duration of the last loading in seconds
+        # peak resident memory (MB) of the last 'load', 'compile' and 'match'
+        # phases, of the process so far if memory_per_phase is False
+        self.phase_memory = {}
+        self.memory_per_phase = False
+
+        # --- Reading of the snapshots (SQLITE section of the ini file) ---
+        self.sqlite_immutable = True     # the copies never change
+        self.sqlite_mmap = 256*2**20     # memory mapped bytes (0: none)
+        self.sqlite_cache = 64*2**10     # page cache in KiB (0: default)
+
+        # --- Compiled kernels (NUMBA section of the ini file) ---
+        self.kernel_cache = ''  # numba cache folder ('': next to sources)
+        self.read_settings()
+
+        # copy of papers
+        self.papers_save = {}
+
+        # normalised forms of the raw names (see normalize_name), kept
+        # between the compilations, the least recently used ones are
+        # dropped past memo_size entries
+        self.name_memo = OrderedDict()
+        self.memo_size = 1 << 18
+
+        # --- Time gestion (NumPy vectorised) ---
+        self.today = np.array([time()]).astype('datetime64[s]').astype(
+            'datetime64[D]')
+
+        self.tod_1w = self.today -   7 # today minus one week
+        self.tod_1m = self.today -  31 # today minus one month
+        self.tod_1y = self.today - 365 # today minus one year
+
+        # --- Comparison results ---
+        # pairs removed by each stage of the last comparison
+        self.filter_report = {}
+        # one entry per matching pair in compact columns, the shown lines
+        # are built on demand by result_rows
+        self.reset_results()
+
+        # Warm-Up for numba.njit acceleration, in the background: the
+        # interface shows up while the kernels are compiled (or read from
+        # their cache), the comparison waits for them
+        self.warmup = threading.Thread(target=self.warm_up, daemon=True)
+        self.warmup.start()
+
+    def warm_up(self) -> None:
+        """
+        Function to get the numba kernels ready: they are compiled with
+        their explicit signatures (or read from the cache) when distances is
+        imported, the calls check them with the types of the comparison:
+        names as characters code (see name_buffer) and first name tokens
+        (see tokenize_first_name).
+        """
+        codes, offsets = self.name_buffer(['abcde', 'abdce'])
+        name_1 = codes[offsets[0]:offsets[1]]
+        name_2 = codes[offsets[1]:offsets[2]]
+        pairs = np.zeros(1, dtype=np.int64)
+        work = np.zeros((3, 64), dtype=np.int32)
+        for damerau in [False, True]:
+            distances.Field_distance(name_1, name_2, 0.1, damerau, work)
+            distances.Both_name_distance(name_1, name_2, name_1, name_2, 0.1,
+                                         0, damerau, work)
+
+            distances.Batch_distances(codes, offsets, pairs, pairs+1, 0.1,
+                                      damerau, 1)
+
+            distances.Batch_both_name_distances(codes, offsets, codes,
+                                                offsets, pairs, pairs+1, 0.1,
+                                                0, damerau, 1)
+
+        distances.Levenshtein_distance_ws(name_1, name_2, 0.1, work)
+        distances.Damerau_Levenshtein_distance_ws(name_1, name_2, 0.1, work)
+        distances.Initials_compatible(*self.tokenize_first_name('R. S.'),
+                                      *self.tokenize_first_name('Robert'))
+
+    def reset_model(self) -> None:
+        """
+        Function to empty the compiled documents and authors. They are
+        stored in columns (one array per field) indexed by the document
+        index or the author id, the links between both being in compressed
+        sparse rows (CSR) arrays.
+        """
+        # --- Documents ---
+        self.paper_keys   = np.zeros(0, dtype=object) # citation keys
+        self.paper_items  = np.zeros(0, dtype=np.int64) # itemID
+        self.paper_hash   = np.zeros(0, dtype=object) # itemKey (files)
+        self.paper_parent = np.zeros(0, dtype=np.int64) # parentItemID
+        self.paper_date   = np.zeros(0, dtype='datetime64[D]') # creation
+        self.paper_title  = np.zeros(0, dtype=object) # title
+        # authors id of document p: paper_auth[paper_ptr[p]:paper_ptr[p+1]]
+        self.paper_ptr  = np.zeros(1, dtype=np.int64)
+        self.paper_auth = np.zeros(0, dtype=np.int32)
+
+        # --- Authors ---
+        # interning: key 'last, first' -> id, and id -> key (the ids follow
+        # the sorted keys)
+        self.auth_ids = {}
+        self.auth_keys = np.zeros(0, dtype=str)
+        # documents of author a: auth_paper[auth_ptr[a]:auth_ptr[a+1]]
+        self.auth_ptr   = np.zeros(1, dtype=np.int64)
+        self.auth_paper = np.zeros(0, dtype=np.int64)
+        # 'firstName', 'lastName', 'firstName_uc', 'lastName_uc' (arrays of
+        # str) and first name tokens 'f_tok', 'f_tok_uc' (lists of tuples)
+        self.auth_names = {}
+        # reduced names as concatenated characters code and boundaries, per
+        # name ('l_Name_r', 'f_Name_r', 'l_Name_uc_r', 'f_Name_uc_r')
+        self.name_codes = {}
+        self.auth_time = np.zeros(0)      # for optimised comparison
+        self.auth_abv = np.zeros(0)       # if first name have an initial
+        # letters of all the reduced names (column of the bags), and per
+        # reduced name the letters count of each author (sparse matrices)
+        self.alphabet = np.zeros(0, dtype=np.uint32)
+        self.name_bags = {}
+        # characters presence of the reduced names (64 bits), per name
+        self.name_sigs = {}
+
+    def paper(self, index:int) -> Paper_record:
+        """
+        Function to get a view on a compiled document.
+
+        Parameters
+        ----------
+        index : int
+            Index of the document.
+
+        Returns
+        -------
+        Paper_record
+            View on the document.
+
+        """
+        return Paper_record(self, index)
+
+    def author(self, index:int) -> Author_record:
+        """
+        Function to get a view on a compiled author.
+
+        Parameters
+        ----------
+        index : int
+            Id of the author (see auth_ids).
+
+        Returns
+        -------
+        Author_record
+            View on the author.
+
+        """
+        return Author_record(self, index)
+
+    def author_field(self, field:str, index:int):
+        """
+        Function to get a name field of an author.
+
+        Parameters
+        ----------
+        field : str
+            Field name: a key of auth_names, or of name_codes for the
+            reduced names.
+        index : int
+            Id of the author.
+
+        Returns
+        -------
+        str | tuple | np.ndarray
+            Name, first name tokens or characters code of the reduced name.
+
+        """
+        if field in self.name_codes:
+            codes, offsets = self.name_codes[field]
+            return codes[offsets[index]:offsets[index+1]]
+
+        return self.auth_names[field][index]
+
+    def read_settings(self) -> None:
+        """
+        Function to read the comparison settings of the ini file, the
+        missing ones keep their default value.
+
+        """
+        config = configparser.ConfigParser()
+        config.read(self.config_path)
+        if config.has_section('COMPUTE'):
+            self.shards = max(1, config['COMPUTE'].getint('SHARDS',
+                                                          self.shards))
+
+            self.chunk_size = max(1, config['COMPUTE'].getint(
+                'CHUNK_SIZE', self.chunk_size))
+
+            self.low_memory = config['COMPUTE'].getboolean(
+                'LOW_MEMORY', self.low_memory)
+
+            self.read_chunk = max(1, config['COMPUTE'].getint(
+                'READ_CHUNK', self.read_chunk))
+
+            self.load_threads = max(1, config['COMPUTE'].getint(
+                'LOAD_THREADS', self.load_threads))
+
+        if config.has_section('SQLITE'):
+            self.sqlite_immutable = config['SQLITE'].getboolean(
+                'IMMUTABLE', self.sqlite_immutable)
+
+            self.sqlite_mmap = max(0, config['SQLITE'].getint(
+                'MMAP_SIZE', self.sqlite_mmap))
+
+            self.sqlite_cache = max(0, config['SQLITE'].getint(
+                'CACHE_SIZE', self.sqlite_cache))
+
+        if config.has_section('NUMBA'):
+            self.kernel_cache = config['NUMBA'].get('CACHE_DIR',
+                                                    self.kernel_cache)
+
+        if self.kernel_cache != '':
+            # read when the kernels are compiled or loaded, also by the
+            # processes of the comparison pool
+            folder = str(Path(self.kernel_cache).expanduser().resolve())
+            os.environ['NUMBA_CACHE_DIR'] = folder
+            if 'numba' in sys.modules:
+                sys.modules['numba'].config.CACHE_DIR = folder
+
+    def connect_snapshot(self, path:Path) -> sqlite3.Connection:
+        """
+        Function to open a read-only connection to a copied database. The
+        copy is only read: with sqlite_immutable, SQLite does not lock nor
+        check it for changes, and its pages can be memory mapped
+        (sqlite_mmap) and kept in a larger cache (sqlite_cache).
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            Access path to database.
+
+        Returns
+        -------
+        connect : sqlite3.Connection
+            Connection to close once read.
+
+        """
+        uri = f"file:{path}?mode=ro"
+        if self.sqlite_immutable:
+            uri += "&immutable=1"
+
+        connect = sqlite3.connect(uri, uri=True)
+        if self.sqlite_mmap > 0:
+            connect.execute(f"PRAGMA mmap_size={self.sqlite_mmap};")
+        if self.sqlite_cache > 0:
+            # negative: size in KiB instead of pages
+            connect.execute(f"PRAGMA cache_size=-{self.sqlite_cache};")
+
+        return connect
+
+    def start_memory(self) -> None:
+        """
+        Function to start the measure of the peak resident memory of a
+        phase: on Linux, the peak of the process is reset (see proc(5),
+        /proc/self/clear_refs), elsewhere peak_memory gives the peak since
+        the start of the process (memory_per_phase is False).
+        """
+        try:
+            with open('/proc/self/clear_refs', 'w') as clear_refs:
+                clear_refs.write('5')
+
+            self.memory_per_phase = True
+
+        except OSError:
+            self.memory_per_phase = False
+
+    def peak_memory(self) -> float:
+        """
+        Function to get the peak resident memory of the process since the
+        last start_memory (memory_per_phase) or since its start.
+
+        Returns
+        -------
+        float | None
+            Peak resident set size in MB, None where it is not available
+            (Windows).
+
+        """
+        if self.memory_per_phase:
+            with open('/proc/self/status') as status:
+                for line in status:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1])/1024
+
+        if resource is None:
+            return None
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        if sys.platform == 'darwin':
+            peak = peak/1024
+
+        return peak/1024
+
+    def name_buffer(self, names:list) -> (np.ndarray, np.ndarray):
+        """
+        Function to concatenate names into one array of characters code.
+
+        Parameters
+        ----------
+        names : list
+            List of strings.
+
+        Returns
+        -------
+        codes : np.ndarray
+            Unicode code of all the characters, dtype uint32.
+        offsets : np.ndarray
+            Name i is codes[offsets[i]:offsets[i+1]], dtype int64.
+
+        """
+        offsets = np.zeros(len(names)+1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(n) for n in names])
+        codes = np.frombuffer(''.join(names).encode('utf-32-le'),
+                              dtype=np.uint32).copy()
+
+        return codes, offsets
+
+    def start_progress(self, total:int) -> None:
+        """
+        Function to start the progression report of a long phase.
+
+        Parameters
+        ----------
+        total : int
+            Total number of iteration expected.
+
+        """
+        self.index = 0
+        self.tot_idx = total
+        self.t_progress = perf_counter()
+        if self.progress is not None:
+            self.progress(self.index, self.tot_idx)
+
+    def update_progress(self, index:int, force:bool=False) -> bool:
+        """
+        Function to update the progression, the callback is only called when
+        at least `refresh_rate` milliseconds passed since the last report.
+
+        Parameters
+        ----------
+        index : int
+            Current iteration.
+        force : bool, optional
+            Call the callback whatever the time since the last report, used
+            between the steps of a phase. The default is False.
+
+        Returns
+        -------
+        stop : bool
+            If the phase must be cancelled (True) or not (False).
+
+        """
+        self.index = index
+        stop = False
+        if force or (perf_counter()-self.t_progress >
+                     self.refresh_rate/1000):
+            self.t_progress = perf_counter()
+            if self.progress is not None:
+                stop = bool(self.progress(self.index, self.tot_idx))
+
+        return stop
+
+    def reduce_string(self, string:str) -> str:
+        """
+        Function to remove space and dot in a string
+
+        Parameters
+        ----------
+        string : str
+            String to clean.
+
+        Returns
+        -------
+        str
+            Cleaned string.
+
+        """
+        return string.replace(' ', '').replace('.', '')
+
+    def normalize_name(self, string:str, first:bool=False) -> tuple:
+        """
+        Function to compute all the normalised forms of a raw name, once:
+        they are kept in name_memo for the next authors and compilations
+        with the same name.
+
+        Parameters
+        ----------
+        string : str
+            Raw first or last name.
+        first : bool, optional
+            If the name is a first name, only them are tokenized. The
+            default is False.
+
+        Returns
+        -------
+        tuple
+            Name without special characters, reduced name (see
+            reduce_string), reduced name without special characters, and
+            for a first name the tokens of the name and of its version
+            without special characters (see tokenize_first_name, None for a
+            last name).
+
+        """
+        forms = self.name_memo.get(string)
+        if forms is None:
+            if len(self.name_memo) >= self.memo_size:
+                self.name_memo.popitem(last=False)
+
+            reduced = self.reduce_string(string)
+            forms = (unidecode.unidecode(string), reduced,
+                     unidecode.unidecode(reduced), None, None)
+
+        else:
+            self.name_memo.move_to_end(string)
+
+        if first and (forms[3] is None):
+            # also seen as a last name before
+            forms = forms[:3]+(self.tokenize_first_name(string),
+                               self.tokenize_first_name(forms[0]))
+
+        self.name_memo[string] = forms
+        return forms
+
+    def tokenize_first_name(self, string:str) -> (np.ndarray, np.ndarray,
+                                                  np.ndarray):
+        """
+        Function to split a first name into its casefolded tokens, an initial
+        being a token followed by a dot or made of a single letter.
+
+        Parameters
+        ----------
+        string : str
+            First name to split (i.e.: 'R. S. John', 'J.-L.').
+
+        Returns
+        -------
+        codes : np.ndarray
+            Concatenated characters code of the tokens.
+        offsets : np.ndarray
+            Tokens boundaries in codes.
+        initials : np.ndarray
+            If each token is an initial.
+
+        """
+        codes = [] ; offsets = [0] ; initials = []
+        for chunk in string.casefold().replace('-', ' ').split():
+            parts = chunk.split('.')
+            for p in range(len(parts)):
+                if parts[p] != '':
+                    codes += [ord(c) for c in parts[p]]
+                    offsets.append(len(codes))
+                    initials.append((p < len(parts)-1) or (len(parts[p]) == 1))
+
+        return (np.array(codes, dtype=np.uint32),
+                np.array(offsets, dtype=np.int64),
+                np.array(initials, dtype=bool))
+
+    def duplicate_table(self, from_path:str=None, to_path:str=None) -> None:
+        """
+        Function to duplicate the database tagerted with the main.ini file to
+        be able to read sql file even when Zotero app is running.
+
+        Parameters
+        ----------
+        from_path : str | Path, optional
+            Zotero data folder, replacing DATA_PATH of the ini file. The
+            default is None.
+        to_path : str | Path, optional
+            Folder of the copy and exports, replacing SAVE_PATH of the ini
+            file. The default is None.
+
+        """
+        if (from_path is None) or (to_path is None):
+            config = configparser.ConfigParser()
+            config.read(self.config_path)
+            if from_path is None:
+                from_path = config['PATH'].get('DATA_PATH')
+            if to_path is None:
+                to_path = config['PATH'].get('SAVE_PATH')
+
+        self.from_path = Path(from_path)
+        self.to_path = Path(to_path)
+        self.to_path.mkdir(parents=True, exist_ok=True)
+        if os.path.isfile(self.from_path / 'zotero.sqlite'):
+            shutil.copyfile(self.from_path / 'zotero.sqlite',
+                            self.to_path   / 'zotero.sqlite')
+
+            if os.path.isfile(self.from_path / 'better-bibtex.sqlite'):
+                self.use_zotero_db = False
+                shutil.copyfile(self.from_path / 'better-bibtex.sqlite',
+                                self.to_path   / 'better-bibtex.sqlite')
+
+
+            elif os.path.isfile(self.from_path / 'better-bibtex.migrated'):
+                self.use_zotero_db = False
+                shutil.copyfile(self.from_path / 'better-bibtex.migrated',
+                                self.to_path   / 'better-bibtex.migrated')
+
+            else:
+                # if no better-bibtex db found => will use zotero db
+                self.use_zotero_db = True
+
+        else:
+            self.state = 'ERROR'
+            self.error_type = 'no file'
+
+    def extract_valid_tables(self, path:Path) -> dict:
+        """
+        Function to extract all databse from the copied `.sqlite` files and
+        store them under pandas.DataFrame in a dictionary. The tables are
+        read by load_threads threads, each on its own connection. In low
+        memory mode, only the tables and columns of COMPILE_COLUMNS are read,
+        in turn and by chunks of read_chunk rows, keeping from itemData and
+        itemDataValues the titles and citation keys only. Each chunk is
+        converted to compact types (see compact_table) as soon as it is read.
+        The memory is not bounded by read_chunk: all the read rows of a table
+        are held, with their compact types, until it is joined. The
+        cancellation is checked before each table (between the chunks in
+        low memory mode), the reading then stops.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            Access path to database.
+
+        Returns
+        -------
+        dico_tables : pd.DataFrame
+            Data frame with the extracted data.
+
+        """
+        # Connection to SQLite database copied in read-only mode
+        connect = self.connect_snapshot(path)
+
+        # Query to get list of all tables in database
+        query = "SELECT name FROM sqlite_master WHERE type='table';"
+
+        # Execute the query and fetch all results
+        cursor = connect.cursor()
+
+        cursor.execute(query)
+        tables = [table[0] for table in cursor.fetchall()]
+        dico_tables = {}
+        if not self.low_memory:
+            def read(table:str) -> pd.DataFrame:
+                # the cancellation is checked before each table
+                if self.update_progress(self.index):
+                    return None
+
+                return self.read_table(path, "SELECT * FROM "+table)
+
+            # SQLite releases the GIL while reading
+            with ThreadPoolExecutor(max_workers=self.load_threads) as pool:
+                for table, df in zip(tables, pool.map(read, tables)):
+                    if (df is not None) and (len(df) > 0):
+                        dico_tables[table] = df
+
+        else:
+            # titles and citation keys only (Zotero database), the filters
+            # are run by SQLite which can use the fieldID index and the
+            # valueID key instead of scanning the tables
+            fields = f"fieldID = {TITLE_FIELD}"
+            if 'fields' in tables:
+                fields = (f"fieldID IN ({TITLE_FIELD}, (SELECT fieldID FROM "
+                          "fields WHERE fieldName = 'citationKey'))")
+
+            where = {'itemData':fields}
+            if 'itemData' in tables:
+                where['itemDataValues'] = (
+                    "valueID IN (SELECT valueID FROM itemData WHERE "+fields+
+                    ")")
+
+            # in turn, the chunks being compacted as soon as they are read
+            stop = False
+            for table in [t for t in COMPILE_COLUMNS if t in tables]:
+                query_it = ("SELECT "+', '.join(COMPILE_COLUMNS[table])+
+                            " FROM "+table)
+
+                if table in where:
+                    query_it += " WHERE "+where[table]
+
+                parts = []
+                for df in pd.read_sql_query(query_it, connect,
+                                            chunksize=self.read_chunk):
+                    parts.append(self.compact_table(df))
+                    # the cancellation is checked between the chunks
+                    stop = self.update_progress(self.index)
+                    if stop:
+                        break
+
+                if stop:
+                    break
+
+                if sum([len(df) for df in parts]) > 0:
+                    dico_tables[table] = self.concat_compact(parts)
+
+        # Closes the connection to the database
+        connect.close()
+
+        return dico_tables
+
+    def read_table(self, path:Path, query:str) -> pd.DataFrame:
+        """
+        Function to run a query on its own connection to a copied database,
+        to be called from several threads.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            Access path to database.
+        query : str
+            SQL query.
+
+        Returns
+        -------
+        pd.DataFrame
+            Result of the query.
+
+        """
+        connect = self.connect_snapshot(path)
+        try:
+            # Uses pandas to execute the query and store data in a DataFrame
+            return pd.read_sql_query(query, connect)
+
+        finally:
+            connect.close()
+
+    def compact_table(self, df:pd.DataFrame) -> pd.DataFrame:
+        """
+        Function to store a table with compact types: the integer columns
+        in int32 when they fit and the text columns with repeated values
+        (i.e. first names) as categories.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Table read from the database.
+
+        Returns
+        -------
+        df : pd.DataFrame
+            Same table with compact columns.
+
+        """
+        info = np.iinfo(np.int32)
+        for column in df.columns:
+            values = df[column]
+            if pd.api.types.is_integer_dtype(values):
+                if (values.min() >= info.min) and (values.max() <= info.max):
+                    df[column] = values.astype(np.int32)
+
+            elif pd.api.types.is_string_dtype(values) and (
+                    values.nunique() < len(values)//2):
+                df[column] = values.astype('category')
+
+        return df
+
+    def concat_compact(self, parts:list) -> pd.DataFrame:
+        """
+        Function to join the chunks of a table stored with compact types
+        (see compact_table). The integer columns stay in int32 if all the
+        chunks fit in it, the categories of the chunks are merged and kept
+        if the values repeat in the whole table.
+
+        Parameters
+        ----------
+        parts : list
+            Chunks (pd.DataFrame) of the table, in the reading order.
+
+        Returns
+        -------
+        pd.DataFrame
+            Table with compact columns.
+
+        """
+        columns = {}
+        for column in parts[0].columns:
+            values = [df[column] for df in parts]
+            if not any([isinstance(v.dtype, pd.CategoricalDtype)
+                        for v in values]):
+                columns[column] = pd.concat(values, ignore_index=True)
+                continue
+
+            merged = pd.api.types.union_categoricals(
+                [v.astype('category') for v in values], ignore_order=True)
+
+            if len(merged.categories) >= len(merged)//2:
+                merged = merged.astype(merged.categories.dtype)
+
+            columns[column] = pd.Series(merged)
+
+        return pd.DataFrame(columns)
+
+    def release_tables(self) -> None:
+        """
+        Function to free the raw tables once the database is compiled (low
+        memory mode), they are read again by the next compilation.
+        """
+        self.data = {}
+        self.data_cite_key = {}
+
+    def load_database(self) -> bool:
+        """
+        Function to extract the databse and update associated parameters.
+        The Zotero and Better BibTex databases are read at the same time,
+        the duration is kept in load_time.
+
+        Returns
+        -------
+        bool
+            True if the database was loaded, False if cancelled (the
+            previous one stays loaded).
+
+        """
+        start = perf_counter()
+        self.start_memory()
+        # reading of the databases, then of the citation keys
+        self.start_progress(2)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            # Extracts data from the Zotero database
+            zotero = pool.submit(self.extract_valid_tables,
+                                 self.to_path / 'zotero.sqlite')
+
+            if not self.use_zotero_db:
+                # Extracts data from the Better BibTex database
+                if os.path.isfile(self.to_path / 'better-bibtex.sqlite'):
+                    path_data = self.to_path / 'better-bibtex.sqlite'
+                elif os.path.isfile(self.to_path / 'better-bibtex.migrated'):
+                    path_data = self.to_path / 'better-bibtex.migrated'
+
+                better_bibtex = pool.submit(self.extract_valid_tables,
+                                            path_data)
+
+            data = zotero.result()
+            if not self.use_zotero_db:
+                cite_key = better_bibtex.result()
+
+        if self.update_progress(1, True):
+            return False
+
+        if not self.use_zotero_db:
+            cite_key = cite_key['citationkey'].loc[:,
+                ['citationKey', 'itemID', 'itemKey']]
+
+        else:
+            key_field_id = int(data['fields'].loc[
+                data['fields']['fieldName'] == 'citationKey',
+                'fieldID'].values[0])
+
+            cite_key = data['itemData'][
+                data['itemData']['fieldID'] == key_field_id
+                ].reset_index(drop=True)
+
+            cite_key = cite_key.merge(data['itemDataValues'], on='valueID')
+            cite_key = cite_key.merge(
+                data['items'].loc[:, ['itemID', 'key']], on='itemID')
+
+            cite_key = cite_key.rename(
+                columns={'value':'citationKey', 'key':'itemKey'})
+
+            cite_key = cite_key.drop(columns=['fieldID', 'valueID'])
+
+        if self.update_progress(2, True):
+            return False
+
+        self.data = data
+        self.data_cite_key = cite_key
+        self.one_loaded = True
+        if self.comp_st == 2:
+            # the compiled data no longer match the loaded database
+            self.comp_st = 1
+
+        self.load_time = perf_counter()-start
+        self.phase_memory['load'] = self.peak_memory()
+        return True
+
+    def treat_by_paper(self) -> bool:
+        """
+        Function to extract usefull documents informations and pre compute
+        some of ther caracteristics for optimisation. The links between the
+        Zotero tables are resolved by column for all the documents at once,
+        then the distinct names are normalised one by one (progression) and
+        spread to the authors.
+
+        Returns
+        -------
+        bool
+            True if the compilation went to its end, False if cancelled.
+
+        Informations extracted / used, per document p:
+        paper_keys[p]: str
+            Beter bibtex citation key
+        paper_items[p]: int
+            ID of the document, used as a link with the creator table.
+        paper_hash[p]: str
+            Hash key where the files linked to the document are stored.
+        paper_parent[p]: int
+            An other ID of the document to make the link between the
+            tables.
+        paper_date[p]: numpy.datetime64
+            dtype: datetime64[D] It is defined when the document was
+            created.
+        paper_title[p]: str
+            The document title.
+        paper_auth[paper_ptr[p]:paper_ptr[p+1]]: numpy.ndarray
+            Id of its authors, whose names are in auth_names.
+
+        """
+        self.reset_model()
+        if self.one_loaded and (len(self.data) == 0):
+            # tables released after the previous compilation
+            if not self.load_database():
+                return False
+
+        self.start_memory()
+
+        self.num_elem = len(self.data_cite_key)
+        items = self.data_cite_key.loc[:, 'itemID'].to_numpy(np.int64)
+
+        # Various id linked to the document (its first attachment)
+        attach = self.data['itemAttachments'].drop_duplicates(
+            'parentItemID').set_index('parentItemID')
+
+        parent = attach.loc[items, 'itemID'].to_numpy(np.int64)
+
+        # When the document was created in zotero
+        dates = self.data['items'].drop_duplicates('itemID').set_index(
+            'itemID').loc[parent, 'clientDateModified']
+
+        # Get the tile of the document (last title field of the parent)
+        data = self.data['itemData']
+        titles = data[data['fieldID'] == TITLE_FIELD].drop_duplicates(
+            'itemID', keep='last')
+
+        values = self.data['itemDataValues'].drop_duplicates(
+            'valueID').set_index('valueID')['value']
+
+        titles = pd.Series(values.loc[titles['valueID']].to_numpy(),
+                           index=titles['itemID'].to_numpy())
+
+        # Get the first and last name of the authors, in the creators order
+        # of each document
+        links = self.data['itemCreators'].loc[:, ['itemID', 'creatorID']]
+        links = links.assign(row=np.arange(len(links)))
+        links = pd.DataFrame({'paper':np.arange(self.num_elem),
+                              'itemID':items}).merge(links, on='itemID')
+
+        links = links.sort_values(['paper', 'row'])
+        creators = self.data['creators'].drop_duplicates(
+            'creatorID').set_index('creatorID')
+
+        fname = creators.loc[links['creatorID'], 'firstName'].to_numpy(
+            object)
+
+        lname = creators.loc[links['creatorID'], 'lastName'].to_numpy(
+            object)
+
+        # authors interning, the ids follow the sorted keys 'last, first'
+        authkeys, first, auth_of = np.unique(
+            (lname+', '+fname).astype(str), return_index=True,
+            return_inverse=True)
+
+        num_aut = len(authkeys)
+        paper_of = links['paper'].to_numpy(np.int64)
+
+        self.paper_keys = self.data_cite_key.loc[:, 'citationKey'].to_numpy(
+            object)
+
+        self.paper_items = items
+        self.paper_hash = self.data_cite_key.loc[:, 'itemKey'].to_numpy(
+            object)
+
+        self.paper_parent = parent
+        self.paper_date = np.array(list(dates), dtype='datetime64[s]'
+                                   ).astype('datetime64[D]')
+
+        self.paper_title = titles.reindex(parent).fillna('').to_numpy(
+            object)
+
+        self.paper_ptr = np.searchsorted(paper_of,
+                                         np.arange(self.num_elem+1))
+
+        self.paper_auth = auth_of.astype(np.int32)
+
+        # documents of each author, once and in the documents order
+        pairs = np.unique(auth_of*max(self.num_elem, 1)+paper_of)
+        self.auth_paper = pairs % max(self.num_elem, 1)
+        self.auth_ptr = np.searchsorted(pairs // max(self.num_elem, 1),
+                                        np.arange(num_aut+1))
+
+        self.auth_keys = authkeys
+        self.auth_ids = {k: i for i, k in enumerate(authkeys)}
+        names = self.auth_names
+        names['firstName'] = fname[first]
+        names['lastName'] = lname[first]
+        # 1d array for time comparison wich will be faster than loop: date
+        # of the last document of each author
+        if num_aut > 0:
+            self.auth_time = np.maximum.reduceat(
+                self.paper_date[self.auth_paper], self.auth_ptr[:-1])
+        else:
+            self.auth_time = np.zeros(0, dtype='datetime64[D]')
+
+        # the same first or last name is shared by many authors: the
+        # normalisation runs once per distinct string
+        strings, string_of = np.unique(
+            np.concatenate([names['firstName'], names['lastName']]).astype(
+                str), return_inverse=True)
+
+        is_first = np.zeros(len(strings), dtype=bool)
+        is_first[string_of[:num_aut]] = True
+
+        forms = []
+        self.start_progress(len(strings))
+        # cancelled during the joins
+        stop = self.update_progress(0, True)
+        for s in range(len(strings)):
+            if stop:
+                break
+
+            forms.append(self.normalize_name(str(strings[s]), is_first[s]))
+            stop = self.update_progress(s+1)
+
+        if not stop:
+            f_of = string_of[:num_aut] ; l_of = string_of[num_aut:]
+            column = lambda k, of: [forms[s][k] for s in of]
+            names['firstName_uc'] = np.array(column(0, f_of), dtype=object)
+            names['lastName_uc'] = np.array(column(0, l_of), dtype=object)
+            # first name tokens for the abbreviation matching
+            names['f_tok'] = column(3, f_of)
+            names['f_tok_uc'] = column(4, f_of)
+            # if author first name have an initial in it
+            self.auth_abv = np.array([np.any(tok[2]) for tok in names[
+                'f_tok']], dtype=bool)
+
+            reduced = {'l_Name_r':column(1, l_of), 'f_Name_r':column(1, f_of),
+                       'l_Name_uc_r':column(2, l_of),
+                       'f_Name_uc_r':column(2, f_of)}
+
+            # names buffers for the batched and pair by pair comparisons
+            for n in reduced:
+                self.name_codes[n] = self.name_buffer(reduced[n])
+
+            # letters in authors last and first name
+            self.letter_bags()
+            stop = self.update_progress(len(strings), True)
+
+        if not stop:
+            self.name_signatures()
+            stop = self.update_progress(len(strings), True)
+
+        if stop:
+            # a partial compilation can not be compared
+            self.reset_model()
+            return False
+
+        if self.low_memory:
+            # only the compiled columns are used from now
+            self.release_tables()
+
+        self.phase_memory['compile'] = self.peak_memory()
+        return True
+
+    def letter_bags(self) -> None:
+        """
+        Function to count the letters of the reduced names, the four names
+        variants (with / without special characters) at once. All the
+        characters codes are mapped to the shared alphabet in one pass, so
+        its size is not bounded, then each variant gets its sparse matrix of
+        counts (authors x alphabet) in name_bags.
+        """
+        fields = list(self.name_codes)
+        codes = np.concatenate([np.zeros(0, dtype=np.uint32)] + [
+            self.name_codes[n][0] for n in fields])
+
+        # letter code -> column
+        self.alphabet, columns = np.unique(codes, return_inverse=True)
+        self.name_bags = {}
+        start = 0
+        for n in fields:
+            offsets = self.name_codes[n][1]
+            num_aut = len(offsets)-1
+            rows = np.repeat(np.arange(num_aut), np.diff(offsets))
+            stop = start+offsets[-1]
+            # the repeated (author, letter) entries are summed
+            self.name_bags[n] = sparse.coo_matrix(
+                (np.ones(len(rows), dtype=np.int32),
+                 (rows, columns[start:stop])),
+                shape=(num_aut, len(self.alphabet))).tocsr()
+
+            start = stop
+
+    def name_signatures(self) -> None:
+        """
+        Function to compute the characters presence signature of the
+        reduced names: bit (code % 64) is set for each character of the
+        name, in name_sigs (uint64 per author).
+        """
+        self.name_sigs = {}
+        for n, (codes, offsets) in self.name_codes.items():
+            num_aut = len(offsets)-1
+            rows = np.repeat(np.arange(num_aut), np.diff(offsets))
+            self.name_sigs[n] = np.zeros(num_aut, dtype=np.uint64)
+            np.bitwise_or.at(self.name_sigs[n], rows,
+                             np.left_shift(np.uint64(1),
+                                           (codes % 64).astype(np.uint64)))
+
+    def letter_bag(self, field:str) -> np.ndarray:
+        """
+        Function to get the letters count of a reduced name as a dense
+        array, restricted to the letters used by this name variant.
+
+        Parameters
+        ----------
+        field : str
+            Reduced name ('l_Name_r', 'f_Name_r', 'l_Name_uc_r' or
+            'f_Name_uc_r').
+
+        Returns
+        -------
+        np.ndarray
+            Letters count of each author (authors x used letters).
+
+        """
+        bag = self.name_bags[field]
+        return bag[:, np.unique(bag.indices)].toarray()
+
+    def name_lengths(self, field:str) -> np.ndarray:
+        """
+        Function to get the length of a reduced name for each author.
+
+        Parameters
+        ----------
+        field : str
+            Reduced name ('l_Name_r', 'f_Name_r', 'l_Name_uc_r' or
+            'f_Name_uc_r').
+
+        Returns
+        -------
+        np.ndarray
+            Number of characters of each author name.
+
+        """
+        return np.diff(self.name_codes[field][1])
+
+    def preparation_matching(self) -> (np.ndarray, np.ndarray, str, str, str,
+                                       str, str):
+        """
+        Function to make the global first step for every mathing options:
+        the authors pairs to compare are built from sorted windows and
+        reduced by the pre-filters, without going through the square of
+        all the pairs.
+
+        Returns
+        -------
+        idx_i : numpy.ndarray
+            Id of the first author of each kept pair.
+        idx_j : numpy.ndarray
+            Id of the second author of each kept pair (idx_i < idx_j, in the
+            upper triangle order).
+        firstName : str
+            First name author.
+        lastName : str
+            Last name author.
+        firstName_r : str
+            First name author reduced from space and dot.
+        lastName_r : str
+            Last name author reduced from space and dot.
+        firstName_tk : str
+            First name author tokens for the abbreviation matching.
+
+        """
+        w = len(self.auth_time)
+        # pairs removed by each pre-filter stage
+        self.filter_report = {'pairs':w*(w-1)//2}
+        nodes = np.arange(w)
+
+        # Compute time filtering using numpy.ndarray, both authors must pass
+        # it so the others are removed before making the pairs
+        if self.to_filter == 'today':
+            mask_time = self.auth_time >= self.today
+        elif self.to_filter == 'tod-1w':
+            mask_time = self.auth_time >= self.tod_1w
+        elif self.to_filter == 'tod-1m':
+            mask_time = self.auth_time >= self.tod_1m
+        elif self.to_filter == 'tod-1y':
+            mask_time = self.auth_time >= self.tod_1y
+
+        if self.to_filter != None:
+            nodes = self.filter_authors(nodes, mask_time[nodes], 'time')
+
+        if np.any(self.use_special):
+            firstName = 'firstName' ; lastName = 'lastName'
+            firstName_r = 'f_Name_r' ; lastName_r = 'l_Name_r'
+            firstName_tk = 'f_tok'
+        else:
+            # First and Last names without special caracters,
+            # removed with unicode.unicode
+            firstName = 'firstName_uc' ; lastName = 'lastName_uc'
+            firstName_r = 'f_Name_uc_r' ; lastName_r = 'l_Name_uc_r'
+            firstName_tk = 'f_tok_uc'
+
+        # lengths of the compared names variant
+        len_last = self.name_lengths(lastName_r)
+        len_first = self.name_lengths(firstName_r)
+
+        if self.to_compare == 'lastname':
+            # Ignore the case if one of the author didn't give its last name
+            # (not seen in my corpus of size 3,734)
+            mask = len_last > 0
+
+        elif self.to_compare == 'firstname':
+            # Ignore the case if an author didn't give its first name (i.e.:
+            # organisations, anonymous, some indonesian authors...)
+            mask = len_first > 0
+
+        elif self.to_compare == 'bothname':
+            # Ignore the case if an author didn't give its first name (i.e.:
+            # organisations, anonymous, some indonesian authors...)
+            mask = (len_last > 0)&(len_first > 0)
+
+        nodes = self.filter_authors(nodes, mask[nodes], 'empty')
+
+        check_abv = np.any(self.filter_abv)
+        fields = []
+        if self.algo == 'Levenshtein' or self.algo == 'DamerauLevenshtein':
+            # for Damerau-Levenshtein, I need to implement a safer parameter
+            # due to transposition matrix test
+            if self.to_compare == 'lastname':
+                fields = [lastName_r]
+            elif self.to_compare == 'firstname':
+                fields = [firstName_r]
+            elif self.to_compare == 'bothname':
+                fields = [lastName_r, firstName_r]
+
+            if check_abv and (self.to_compare != 'lastname'):
+                # the first names length and letters are not relevant when
+                # abbreviations are matched against full names
+                if (self.to_compare == 'bothname') and (
+                        self.both_comp == 'AND'):
+                    fields = [lastName_r]
+                else:
+                    fields = []
+
+        if check_abv:
+            # compatible first names share their first initial
+            initials = self.first_initials(firstName_tk)
+
+        if len(fields) > 0:
+            if (len(fields) == 2) and (self.both_comp == 'OR'):
+                # pairs close on one of the names
+                idx_i, idx_j = self.length_pairs(fields, nodes,
+                                                 self.treshold)
+            elif (len(fields) == 2) and (self.both_comp == 'AVG'):
+                # the other name can give a null distance
+                idx_i, idx_j = self.length_pairs(fields[:1], nodes,
+                                                 min(2*self.treshold, 1.))
+            else:
+                # the last name window is enough for AND
+                idx_i, idx_j = self.length_pairs(fields[:1], nodes,
+                                                 self.treshold)
+
+            stage = 'length'
+
+        elif check_abv and (self.to_compare == 'firstname'):
+            idx_i, idx_j = self.initials_pairs(initials, nodes)
+            stage = 'initials'
+
+        elif self.algo == 'Perfect':
+            # only the same names can match: windows of the equal names
+            if self.to_compare == 'lastname':
+                names = [lastName]
+            elif self.to_compare == 'firstname':
+                names = [firstName]
+            elif check_abv or (self.both_comp == 'OR'):
+                # the first names are matched below
+                names = [lastName]
+            else:
+                names = [lastName, firstName]
+
+            idx_i, idx_j = self.same_pairs(names, nodes)
+            if (self.to_compare == 'bothname') and (
+                    self.both_comp == 'OR') and not check_abv:
+                # or the same first names (the others last names)
+                last = self.name_groups(lastName)
+                pair_i, pair_j = self.same_pairs([firstName], nodes)
+                keep = last[pair_i] != last[pair_j]
+                idx_i = np.concatenate([idx_i, pair_i[keep]])
+                idx_j = np.concatenate([idx_j, pair_j[keep]])
+
+            stage = 'same'
+
+        else:
+            # abbreviations under OR and AVG: the last names are close, the
+            # first names distance being 0 or 1 (compatible or not)
+            budget = self.treshold
+            if self.both_comp == 'AVG':
+                budget = min(2*self.treshold, 1.)
+
+            idx_i, idx_j = self.length_pairs([lastName_r], nodes, budget)
+            stage = 'length'
+
+        if check_abv and (self.to_compare == 'bothname') and (
+                self.both_comp == 'OR'):
+            # or the first names compatible: pairs of the same initial, the
+            # others being only kept for their last names
+            keep = initials[idx_i] != initials[idx_j]
+            pair_i, pair_j = self.initials_pairs(initials, nodes)
+            idx_i = np.concatenate([idx_i[keep], pair_i])
+            idx_j = np.concatenate([idx_j[keep], pair_j])
+
+        # pairs never built
+        self.filter_report[stage] = (len(nodes)*(len(nodes)-1)//2 -
+                                     len(idx_i))
+
+        if check_abv:
+            # at least one of the two first names must be abbreviated
+            idx_i, idx_j = self.apply_filter(
+                idx_i, idx_j, self.auth_abv[idx_i]|self.auth_abv[idx_j],
+                'abbreviation')
+
+            # compatible first names needed, unless the last names alone
+            # can match (OR, AVG with a treshold from 0.5)
+            if (self.to_compare != 'bothname') or (
+                    self.both_comp == 'AND') or ((self.both_comp == 'AVG')
+                    and ((self.algo == 'Perfect') or (self.treshold < .5))):
+                idx_i, idx_j = self.apply_filter(
+                    idx_i, idx_j, initials[idx_i] == initials[idx_j],
+                    'initials')
+
+        if len(fields) > 0:
+            # lengths of each name (the windows only bound one of them),
+            # written as the distances to get the same rounding
+            idx_i, idx_j = self.apply_filter(idx_i, idx_j, self.combine_names(
+                [np.abs(l[idx_i]-l[idx_j])/np.maximum(
+                    np.maximum(l[idx_i], l[idx_j]), 1)
+                 for l in [self.name_lengths(f) for f in fields]],
+                lambda dist: dist <= self.treshold), 'length')
+
+            # an edit changes at most two bits of the characters presence
+            # signatures: ceil(popcount(xor)/2) <= distance
+            idx_i, idx_j = self.apply_filter(idx_i, idx_j, self.combine_names(
+                [(np.bitwise_count(s[idx_i]^s[idx_j])+1)//2/np.maximum(
+                    np.maximum(l[idx_i], l[idx_j]), 1)
+                 for s, l in [(self.name_sigs[f], self.name_lengths(f))
+                              for f in fields]],
+                lambda dist: dist <= self.treshold), 'signature')
+
+            # letters count, only on the pairs left
+            idx_i, idx_j = self.apply_filter(
+                idx_i, idx_j, self.letters_filter(idx_i, idx_j, fields),
+                'letters')
+
+        # the matches are recorded in the authors order
+        idx_i, idx_j = self.sort_pairs(idx_i, idx_j, w)
+
+        # Re-Initialisation
+        self.reset_results()
+
+        return (idx_i, idx_j, firstName, lastName, firstName_r, lastName_r,
+                firstName_tk)
+
+    def filter_authors(self, nodes:np.ndarray, keep:np.ndarray, stage:str
+                       ) -> np.ndarray:
+        """
+        Function to apply a pre-filter on the authors themselves (both
+        authors of a pair must pass it), reporting the pairs it removes in
+        filter_report.
+
+        Parameters
+        ----------
+        nodes : np.ndarray
+            Id of the authors kept so far.
+        keep : np.ndarray
+            If each of them is kept by the stage.
+        stage : str
+            Name of the stage.
+
+        Returns
+        -------
+        np.ndarray
+            Id of the authors kept after the stage.
+
+        """
+        kept = nodes[keep]
+        self.filter_report[stage] = (len(nodes)*(len(nodes)-1)//2 -
+                                     len(kept)*(len(kept)-1)//2)
+
+        return kept
+
+    def apply_filter(self, idx_i:np.ndarray, idx_j:np.ndarray,
+                     keep:np.ndarray, stage:str) -> (np.ndarray, np.ndarray):
+        """
+        Function to apply a pre-filter stage on the pairs and report the
+        number of pairs it removes in filter_report.
+
+        Parameters
+        ----------
+        idx_i : np.ndarray
+            First author of the pairs kept so far.
+        idx_j : np.ndarray
+            Second author of the pairs kept so far.
+        keep : np.ndarray
+            If each pair is kept by the stage.
+        stage : str
+            Name of the stage.
+
+        Returns
+        -------
+        idx_i : np.ndarray
+            First author of the pairs kept after the stage.
+        idx_j : np.ndarray
+            Second author of the pairs kept after the stage.
+
+        """
+        self.filter_report[stage] = self.filter_report.get(stage, 0) + int(
+            len(keep)-np.count_nonzero(keep))
+
+        return idx_i[keep], idx_j[keep]
+
+    def length_pairs(self, fields:list, nodes:np.ndarray, budget:float
+                     ) -> (np.ndarray, np.ndarray):
+        """
+        Function to get the pairs of authors whose names lengths allow a
+        distance under the budget: the distance is at least
+        1-min(len)/max(len), once sorted by length the partners of an author
+        are in a window (the exact test is made on the pairs by the
+        pre-filters).
+
+        Parameters
+        ----------
+        fields : list
+            One or two reduced names, with two the pairs close on one of
+            them are given.
+        nodes : np.ndarray
+            Id of the authors to pair.
+        budget : float
+            Maximum distance of the pairs.
+
+        Returns
+        -------
+        idx_i : np.ndarray
+            Smallest id of each pair.
+        idx_j : np.ndarray
+            Highest id of each pair.
+
+        """
+        ratio = max(1.-budget, 1e-12)/(1.+1e-9)
+        first = self.name_lengths(fields[0])
+        idx_i, idx_j = self.window_pairs(first, nodes, lambda l: l/ratio)
+        if len(fields) == 2:
+            # without the pairs already given by the first window
+            pair_i, pair_j = self.window_pairs(self.name_lengths(fields[1]),
+                                               nodes, lambda l: l/ratio)
+
+            keep = np.maximum(first[pair_i], first[pair_j]) > (
+                np.minimum(first[pair_i], first[pair_j])/ratio)
+            idx_i = np.concatenate([idx_i, pair_i[keep]])
+            idx_j = np.concatenate([idx_j, pair_j[keep]])
+
+        return idx_i, idx_j
+
+    def name_groups(self, name:str) -> np.ndarray:
+        """
+        Function to number the distinct values of a name.
+
+        Parameters
+        ----------
+        name : str
+            Name field of auth_names ('lastName', 'firstName_uc'...).
+
+        Returns
+        -------
+        np.ndarray
+            Group of each author, the same for the same name.
+
+        """
+        _, groups = np.unique(self.auth_names[name].astype(str),
+                              return_inverse=True)
+
+        return groups.astype(np.int64)
+
+    def same_pairs(self, names:list, nodes:np.ndarray
+                   ) -> (np.ndarray, np.ndarray):
+        """
+        Function to get the pairs of authors with the same names (Perfect
+        matching).
+
+        Parameters
+        ----------
+        names : list
+            Name fields of auth_names which must all be the same.
+        nodes : np.ndarray
+            Id of the authors to pair.
+
+        Returns
+        -------
+        idx_i : np.ndarray
+            Smallest id of each pair.
+        idx_j : np.ndarray
+            Highest id of each pair.
+
+        """
+        keys = np.zeros(len(self.auth_keys), dtype=np.int64)
+        for name in names:
+            groups = self.name_groups(name)
+            keys = keys*(np.max(groups, initial=0)+1)+groups
+
+        return self.window_pairs(keys, nodes, lambda g: g)
+
+    def first_initials(self, field:str) -> np.ndarray:
+        """
+        Function to get the first initial of the first names, as a
+        characters code (-1 without first name). Two first names can only be
+        compatible (see distances.Initials_compatible) if they share it.
+
+        Parameters
+        ----------
+        field : str
+            First name tokens ('f_tok' or 'f_tok_uc').
+
+        Returns
+        -------
+        np.ndarray
+            First initial of each author.
+
+        """
+        return np.array([tok[0][0] if len(tok[0]) > 0 else -1
+                         for tok in self.auth_names[field]], dtype=np.int64)
+
+    def initials_pairs(self, initials:np.ndarray, nodes:np.ndarray
+                       ) -> (np.ndarray, np.ndarray):
+        """
+        Function to get the pairs of authors with at least one abbreviated
+        first name and the same first initial: the partners of an
+        abbreviated author are the authors of its initial, found by
+        dichotomy once sorted.
+
+        Parameters
+        ----------
+        initials : np.ndarray
+            First initial of each author (see first_initials).
+        nodes : np.ndarray
+            Id of the authors to pair.
+
+        Returns
+        -------
+        idx_i : np.ndarray
+            Smallest id of each pair.
+        idx_j : np.ndarray
+            Highest id of each pair.
+
+        """
+        order = nodes[np.argsort(initials[nodes], kind='stable')]
+        sorted_keys = initials[order]
+        abv = nodes[self.auth_abv[nodes]]
+        start = np.searchsorted(sorted_keys, initials[abv], side='left')
+        counts = np.searchsorted(sorted_keys, initials[abv],
+                                 side='right')-start
+
+        first = np.repeat(abv, counts)
+        second = order[np.arange(len(first)) - np.repeat(
+            np.cumsum(counts)-counts, counts) + np.repeat(start, counts)]
+
+        # two abbreviated authors are paired once
+        keep = (first != second) & ~(self.auth_abv[second] & (second < first))
+        return (np.minimum(first, second)[keep],
+                np.maximum(first, second)[keep])
+
+    def window_pairs(self, keys:np.ndarray, nodes:np.ndarray, upper
+                     ) -> (np.ndarray, np.ndarray):
+        """
+        Function to get the pairs of authors whose keys are close: once the
+        authors are sorted by key, the partners of an author are the next
+        ones up to the key upper(key), found by dichotomy. The cost follows
+        the number of pairs given and not the square of the authors.
+
+        Parameters
+        ----------
+        keys : np.ndarray
+            Key of each author (i.e. a name length).
+        nodes : np.ndarray
+            Id of the authors to pair.
+        upper : callable
+            Gives from the sorted keys the highest key of their partners.
+
+        Returns
+        -------
+        idx_i : np.ndarray
+            Smallest id of each pair.
+        idx_j : np.ndarray
+            Highest id of each pair.
+
+        """
+        order = nodes[np.argsort(keys[nodes], kind='stable')]
+        sorted_keys = keys[order]
+        stop = np.searchsorted(sorted_keys, upper(sorted_keys), side='right')
+        rows = np.arange(len(order))
+        counts = np.maximum(stop-rows-1, 0)
+        # partners of the sorted author r: the positions r+1 to stop[r]-1
+        first = np.repeat(rows, counts)
+        second = np.arange(len(first)) - np.repeat(np.cumsum(counts)-counts,
+                                                   counts) + first + 1
+
+        first = order[first] ; second = order[second]
+        return np.minimum(first, second), np.maximum(first, second)
+
+    def sort_pairs(self, idx_i:np.ndarray, idx_j:np.ndarray, num_aut:int
+                   ) -> (np.ndarray, np.ndarray):
+        """
+        Function to put pairs (idx_i < idx_j) in the upper triangle order
+        (by first then second author).
+
+        Parameters
+        ----------
+        idx_i : np.ndarray
+            Smallest id of each pair.
+        idx_j : np.ndarray
+            Highest id of each pair.
+        num_aut : int
+            Number of authors.
+
+        Returns
+        -------
+        idx_i : np.ndarray
+            First author of each pair.
+        idx_j : np.ndarray
+            Second author of each pair.
+
+        """
+        flat = np.sort(idx_i.astype(np.int64)*num_aut+idx_j)
+        return flat // num_aut, flat % num_aut
+
+    def combine_names(self, values:list, keep) -> np.ndarray:
+        """
+        Function to combine the pre-filter values of one or both names
+        following both_comp.
+
+        Parameters
+        ----------
+        values : list
+            One array per compared name.
+        keep : callable
+            Gives from a value array if the pairs are kept.
+
+        Returns
+        -------
+        np.ndarray
+            Kept pairs: keep on each name (AND, OR) or on their average
+            (AVG).
+
+        """
+        if len(values) == 1:
+            return keep(values[0])
+
+        if self.both_comp == 'AND':
+            return keep(values[0])&keep(values[1])
+
+        if self.both_comp == 'OR':
+            return keep(values[0])|keep(values[1])
+
+        return keep((values[0]+values[1])/2)
+
+    def letters_filter(self, idx_i:np.ndarray, idx_j:np.ndarray,
+                       fields:list, block:int=65536) -> np.ndarray:
+        """
+        Function to test the letters count of the kept pairs: half the L1
+        distance of the letters bags can not exceed the edit distance.
+
+        Parameters
+        ----------
+        idx_i : np.ndarray
+            First author of each pair.
+        idx_j : np.ndarray
+            Second author of each pair.
+        fields : list
+            Compared reduced names.
+        block : int, optional
+            Pairs tested at once. The default is 65536.
+
+        Returns
+        -------
+        keep : np.ndarray
+            If each pair is kept by the letters count.
+
+        """
+        keep = np.zeros(len(idx_i), dtype=bool)
+        bags = [self.letter_bag(f) for f in fields]
+        lengths = [self.name_lengths(f) for f in fields]
+        for start in range(0, len(idx_i), block):
+            i = idx_i[start:start+block] ; j = idx_j[start:start+block]
+            pre_d = [np.abs(b[i]-b[j]).sum(axis=1)/2/np.maximum(l[i], l[j])
+                     for b, l in zip(bags, lengths)]
+
+            keep[start:start+block] = self.combine_names(
+                pre_d, lambda dist: dist <= self.treshold)
+
+        return keep
+
+    def result_rows(self, start:int, stop:int) -> list:
+        """
+        Function to build the shown lines start to stop of the comparison.
+        Each match gives a line with both names, then if asked the lines of
+        their citation keys and an empty line.
+
+        Parameters
+        ----------
+        start : int
+            First line.
+        stop : int
+            Last line (excluded), at most num_rows.
+
+        Returns
+        -------
+        rows : list
+            For each line: (text of the 1st author, text of the 2nd author,
+            if the line is white (False) or grey (True)).
+
+        """
+        rows = []
+        stop = min(stop, self.num_rows)
+        if start >= stop:
+            return rows
+
+        # match of the first line, then the next ones are followed
+        m = bisect_right(self.match_rows, start)-1
+        for r in range(start, stop):
+            while self.match_rows[m+1] <= r:
+                m += 1
+
+            auth_1 = self.author(self.match_i[m])
+            auth_2 = self.author(self.match_j[m])
+            color = m % 2 == 1
+            line = r-self.match_rows[m]
+            if line == 0:
+                fd_1, fd_2 = self.match_fields
+                rows.append((auth_1[fd_1]+', '+auth_1[fd_2],
+                             auth_2[fd_1]+', '+auth_2[fd_2], color))
+
+            elif r == self.match_rows[m+1]-1:
+                rows.append((' ', ' ', color))
+
+            else:
+                # citation keys, the shortest list is completed by spaces
+                k1 = auth_1.citekeys
+                k2 = auth_2.citekeys
+                rows.append((k1[line-1] if line-1 < len(k1) else ' ',
+                             k2[line-1] if line-1 < len(k2) else ' ',
+                             color))
+
+        return rows
+
+    def both_name_initials_distance(self, d_l:float, first_1:tuple,
+                                    first_2:tuple, treshold:float) -> float:
+        """
+        Distance between two authors on both their last and first names when
+        the first names are compared through their tokens (abbreviation
+        matching). The first names distance is 0.0 if they are compatible and
+        1.0 otherwise.
+
+        Parameters
+        ----------
+        d_l : float
+            Last names distance (1.0 when over the treshold, twice the
+            treshold for AVG).
+        first_1 : tuple
+            First name tokens of the first author.
+        first_2 : tuple
+            First name tokens of the second author.
+        treshold : float
+            Maximum distance under which the authors are the same.
+
+        Returns
+        -------
+        float
+            Largest (AND) or smallest (OR) of both distances, or their
+            average (AVG).
+
+        """
+        if (self.both_comp == 'AND') and (d_l > treshold):
+            return 1.0
+
+        # AVG: the last name distance must be under twice the treshold
+        if (self.both_comp == 'AVG') and (d_l > min(2*treshold, 1.0)):
+            return 1.0
+
+        d_f = 1.0-float(distances.Initials_compatible(*first_1, *first_2))
+        if self.both_comp == 'AND':
+            return max(d_l, d_f)
+        elif self.both_comp == 'OR':
+            return min(d_l, d_f)
+
+        return (d_l+d_f)/2
+
+    def reset_results(self) -> None:
+        """
+        Function to empty the comparison results.
+        """
+        self.match_i = array('i')    # index of the 1st author of each match
+        self.match_j = array('i')    # index of the 2nd author of each match
+        self.match_dist = array('f') # distance of each match
+        # first line of each match, followed by the total number of lines
+        self.match_rows = array('q', [0])
+        # group of authors linked by the matches, computed by the export
+        self.match_group = np.zeros(0, dtype=np.int32)
+        # shown name fields, compared one first
+        self.match_fields = ('l_Name', 'f_Name')
+        self.match_addkey = False
+        self.num_match = 0 # number of matching authors pairs
+        # number of complete lines, they can be read while the comparison
+        # appends new matches
+        self.num_rows = 0
+
+    def record_matching(self, i:int, j:int, dist:float) -> None:
+        """
+        Function to append a matching pair into the comparison results.
+
+        Parameters
+        ----------
+        i : int
+            Id of the first author.
+        j : int
+            Id of the second author.
+        dist : float
+            Distance between the two authors (0.0 for perfect matching).
+
+        """
+        n_line = 2
+        if self.match_addkey:
+            n_line += max(self.auth_ptr[i+1]-self.auth_ptr[i],
+                          self.auth_ptr[j+1]-self.auth_ptr[j])
+
+        self.match_i.append(i)
+        self.match_j.append(j)
+        self.match_dist.append(dist)
+        # appended last: the lines of this match can now be read
+        self.match_rows.append(self.match_rows[-1]+n_line)
+        self.num_match += 1
+        self.num_rows = self.match_rows[-1]
+
+    def group_matching(self) -> None:
+        """
+        Function to number the groups of authors linked by the matches
+        (A ~ B and B ~ C give one group), in match_group.
+        """
+        num_aut = len(self.auth_keys)
+        i = np.array(self.match_i, dtype=np.int32)
+        j = np.array(self.match_j, dtype=np.int32)
+        graph = sparse.coo_matrix((np.ones(len(i), dtype=np.int8), (i, j)),
+                           shape=(num_aut, num_aut))
+
+        _, labels = csgraph.connected_components(graph, directed=False)
+        # numbered from 0 in the order of their first match
+        _, first, group = np.unique(labels[i], return_index=True,
+                                    return_inverse=True)
+
+        self.match_group = np.argsort(np.argsort(first))[group].astype(
+            np.int32)
+
+    def batch_matching(self, idx_i:np.ndarray, idx_j:np.ndarray,
+                       firstName_cp:str, lastName_cp:str, check_abv:bool):
+        """
+        Function to test the candidate pairs with the batched distances,
+        sharded over `shards` processes (see parallel.iter_matches). With
+        the abbreviations, only the last names distance is computed (under
+        twice the treshold for AVG), the first names being compared through
+        their tokens.
+
+        Parameters
+        ----------
+        idx_i : np.ndarray
+            Index of the first author of each candidate pair.
+        idx_j : np.ndarray
+            Index of the second author of each candidate pair.
+        firstName_cp : str
+            Compared reduced first name ('f_Name_r' or 'f_Name_uc_r').
+        lastName_cp : str
+            Compared reduced last name ('l_Name_r' or 'l_Name_uc_r').
+        check_abv : bool
+            If the first names are abbreviations matched.
+
+        Yields
+        ------
+        start : int
+            First candidate of the block.
+        stop : int
+            Last candidate of the block (excluded).
+        dists : np.ndarray
+            Distance of each candidate pair of the block (1.0 when over the
+            treshold).
+
+        """
+        params = {'treshold':self.treshold, 'mode':None, 'chunk':1024,
+                  'damerau':self.algo == 'DamerauLevenshtein'}
+
+        arrays = {'idx_1':idx_i, 'idx_2':idx_j}
+        if self.to_compare == 'firstname':
+            arrays['codes_1'], arrays['offsets_1'] = self.name_codes[
+                                                            firstName_cp]
+        else:
+            arrays['codes_1'], arrays['offsets_1'] = self.name_codes[
+                                                            lastName_cp]
+
+        if check_abv:
+            if (self.to_compare == 'bothname') and (self.both_comp == 'AVG'):
+                params['treshold'] = min(2*self.treshold, 1.0)
+
+        elif self.to_compare == 'bothname':
+            params['mode'] = self.both_modes[self.both_comp]
+            arrays['codes_2'], arrays['offsets_2'] = self.name_codes[
+                                                            firstName_cp]
+
+        return parallel.iter_matches(arrays, params, self.shards,
+                                     self.chunk_size)
+
+    def comparison_matching(self) -> bool:
+        """
+        Function to compute the comparison between each authors pair.
+
+        Returns
+        -------
+        bool
+            True if the comparison went to its end, False if cancelled.
+
+        """
+        matches = self.iter_matching()
+        try:
+            while True:
+                next(matches)
+
+        except StopIteration as end:
+            return end.value
+
+    def iter_matching(self):
+        """
+        Generator of the comparison between each authors pair. The matches
+        are recorded (see record_matching) and yielded as soon as they are
+        found, in the authors order, so they can be shown while the
+        comparison runs.
+
+        Yields
+        ------
+        tuple
+            Keys of the two matching authors.
+
+        Returns
+        -------
+        bool
+            True if the comparison went to its end, False if cancelled.
+
+        """
+        self.start_memory()
+        # Global precomputing
+        (idx_i, idx_j, firstName_rpr, lastName_rpr, firstName_cp,
+         lastName_cp, firstName_tk) = self.preparation_matching()
+
+        # kernels warmed up in the background: ready, and the parallel ones
+        # never launched from two threads at once
+        self.warmup.join()
+
+        if self.algo == 'Perfect':
+            firstName_cp = firstName_rpr
+            lastName_cp  = lastName_rpr
+            # 0.0 if same, 1.0 otherwise
+            f_dist = lambda a, b: float(a != b)
+            treshold = 0.0
+
+        else:
+            treshold = self.treshold
+
+        # with abbreviations, first names are compared through their tokens
+        # ('R. S. J.' and 'Robert Stephen John' are compatible)
+        check_abv = np.any(self.filter_abv)
+        if check_abv:
+            firstName_cp = firstName_tk
+
+        authkeys = self.auth_keys
+        # what is needed to build the shown lines
+        if self.to_compare == 'firstname':
+            self.match_fields = (firstName_rpr, lastName_rpr)
+        else:
+            self.match_fields = (lastName_rpr, firstName_rpr)
+
+        self.match_addkey = bool(np.any(self.add_key))
+
+        # only the pairs surviving the pre-filters are visited
+        self.start_progress(len(idx_i))
+        # the distances are computed by blocks with the batched kernels (the
+        # last names only with abbreviations), the matching pairs of each
+        # block are then recorded in order
+        batched = (self.algo != 'Perfect') and not (
+            check_abv and (self.to_compare == 'firstname'))
+
+        if batched:
+            blocks = self.batch_matching(idx_i, idx_j, firstName_cp,
+                                         lastName_cp, check_abv)
+        else:
+            # one block tested pair by pair
+            blocks = [(0, len(idx_i), None)]
+
+        # distance over which the pairs of a block are rejected: compatible
+        # first names are enough under OR, AVG keeps the last names under
+        # twice the treshold
+        limit = treshold
+        if check_abv and (self.to_compare == 'bothname'):
+            if self.both_comp == 'OR':
+                limit = 1.0
+            elif self.both_comp == 'AVG':
+                limit = min(2*treshold, 1.0)
+
+        for start, end, dists in blocks:
+            if batched:
+                pairs = start+np.flatnonzero(dists <= limit)
+            else:
+                pairs = range(start, end)
+
+            for k in pairs:
+                if batched and not check_abv:
+                    dist = dists[k-start]
+                    same = True
+
+                else:
+                    auth_1 = self.author(idx_i[k])
+                    auth_2 = self.author(idx_j[k])
+                    if batched:
+                        # last names distance
+                        d_l = dists[k-start]
+                    elif self.to_compare != 'firstname':
+                        d_l = f_dist(auth_1[lastName_cp],
+                                     auth_2[lastName_cp])
+
+                    # Last / First name comparison
+                    if self.to_compare == 'lastname':
+                        dist = d_l
+                        same = (dist <= treshold) and ((not check_abv) or
+                            distances.Initials_compatible(
+                                *auth_1[firstName_cp],
+                                *auth_2[firstName_cp]))
+
+                    elif (self.to_compare == 'firstname') and check_abv:
+                        same = distances.Initials_compatible(
+                            *auth_1[firstName_cp], *auth_2[firstName_cp])
+
+                        dist = 0.0
+
+                    elif self.to_compare == 'firstname':
+                        dist = f_dist(auth_1[firstName_cp],
+                                      auth_2[firstName_cp])
+
+                        same = dist <= treshold
+
+                    elif check_abv:
+                        dist = self.both_name_initials_distance(
+                            d_l, auth_1[firstName_cp], auth_2[firstName_cp],
+                            treshold)
+
+                        same = dist <= treshold
+
+                    else:
+                        # perfect matching of both names (the distance
+                        # based ones are batched)
+                        d_f = f_dist(auth_1[firstName_cp],
+                                     auth_2[firstName_cp])
+
+                        if self.both_comp == 'AND':
+                            dist = max(d_l, d_f)
+                        elif self.both_comp == 'OR':
+                            dist = min(d_l, d_f)
+                        else:
+                            dist = (d_l+d_f)/2
+
+                        same = dist <= treshold
+
+                if same:
+                    self.record_matching(idx_i[k], idx_j[k], dist)
+                    yield authkeys[idx_i[k]], authkeys[idx_j[k]]
+
+                # the clock is only read every 64 candidates
+                if (not batched) and (k % 64 == 0) and (
+                        self.update_progress(k+1)):
+                    return False
+
+            if self.update_progress(end):
+                if batched:
+                    # stops the shards still running
+                    blocks.close()
+
+                return False
+
+        # pairs rejected by the distances
+        self.filter_report['distance'] = len(idx_i)-self.num_match
+        self.phase_memory['match'] = self.peak_memory()
+        return True
+
+    def export_comparaison(self) -> None:
+        """
+        Function to save the computed comparison in a csv file. The first
+        line of each match also gives its distance and its group of linked
+        authors (see group_matching).
+        """
+        if self.to_path != '':
+            path = self.to_path / 'exported_comparison.csv'
+            if len(self.match_group) != self.num_match:
+                self.group_matching()
+
+            rows = np.array(self.match_rows, dtype=np.int64)
+            # the lines are built and written by blocks (at least the header)
+            block = 100000
+            for start in range(0, max(self.num_rows, 1), block):
+                df = pd.DataFrame(self.result_rows(start, start+block),
+                                  columns=['liste_1', 'liste_2', 'light'])
+
+                # match of each line, the distance and group being only
+                # given on its first line
+                lines = start+np.arange(len(df))
+                m = np.searchsorted(rows, lines, side='right')-1
+                first = rows[m] == lines
+                dist = np.full(len(df), '', dtype=object)
+                group = np.full(len(df), '', dtype=object)
+                dist[first] = [f'{self.match_dist[k]:.3f}' for k in m[first]]
+                group[first] = [str(g) for g in self.match_group[m[first]]]
+                df['distance'] = dist ; df['group'] = group
+                df[['liste_1', 'liste_2', 'distance', 'group']].to_csv(
+                    path, index=False, mode='w' if start == 0 else 'a',
+                    header=start == 0)
+
+    def export_db2json(self) -> None:
+        """
+        Function to save the used database into json file.
+        """
+        if len(self.paper_keys) <= 0:
+            self.state = 'ERROR'
+            self.error_type = 'no compil'
+            
+        else:
+            # Compute time filtering using numpy.ndarray, on the documents
+            # creation date
+            if self.to_filter == 'today':
+                mask_time = self.paper_date >= self.today
+            elif self.to_filter == 'tod-1w':
+                mask_time = self.paper_date >= self.tod_1w
+            elif self.to_filter == 'tod-1m':
+                mask_time = self.paper_date >= self.tod_1m
+            elif self.to_filter == 'tod-1y':
+                mask_time = self.paper_date >= self.tod_1y
+            else:
+                mask_time = np.ones(len(self.paper_keys), dtype=bool)
+
+            self.papers_save = {}
+            for i in np.flatnonzero(mask_time):
+                paper = self.paper(i)
+                self.papers_save[paper.key] = {}
+                self.papers_save[paper.key]['title'] = paper.title
+                self.papers_save[paper.key]['added_date'] = str(paper.date)
+                self.papers_save[paper.key]['lastName'] = paper.lastName
+                self.papers_save[paper.key]['firstName'] = paper.firstName
+
+            try:
+                with open(self.to_path / 'exported_db.json', "w",
+                          encoding="utf-8") as file:
+
+                    json.dump(self.papers_save, file, indent=4)
+
+            except IOError as e:
+                print(f"Error saving dictionary: {e}")
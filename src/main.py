@@ -1,16 +1,12 @@
 
 import pygame
 import numpy as np
-import pandas as pd
 from time import time
-from pathlib import Path
-from buttons import Button_selection, Button_keyboard
+from buttons import Button_selection, Button_keyboard, Inidication, TEXT_CACHE
 
 # Object to manage the database from duplicate to interaction
 from database import DataGest
 
-pygame.init()
-
 class Manager(DataGest):
     """
     Main GUI Manager for the Zotero authors application.
@@ -36,12 +32,6 @@ class Manager(DataGest):
         self.tex_y = 0     # Scroll index (which row starts the display)
         self.delta_txy = 0 # Number of rows currently visible
 
-        # Warm-Up for numba.njit acceleration
-        warmup_1 = np.array(['a', 'b', 'c', 'd', 'e'])
-        warmup_2 = np.array(['f', 'g', 'h', 'i', 'j'])
-        self.Levenshtein_distance_es(warmup_1, warmup_2)
-        self.Damerau_Levenshtein_distance_es(warmup_1, warmup_2)
-
     def reinit(self) -> None:
         """
         Resets the application state, clearing all loaded data and UI positions.
@@ -67,23 +57,13 @@ class Manager(DataGest):
 
         # Data structures
         self.comp_st = 0
-        self.papers = {}
-        self.authors = {}
-        self.auth_time = np.zeros(0)
-        self.auth_abv = np.zeros(0)
-        self.auth_len_last  = np.zeros(0)
-        self.auth_len_first = np.zeros(0)
-        self.letters   = {'l':{}, 'f':{}}
-        self.bag_last  = np.zeros(0)
-        self.bag_first = np.zeros(0)
+        self.reset_model()
 
         self.to_compare = None
         self.to_filter = None
 
-        # Comparison lists for the display panel
-        self.liste1 = []
-        self.liste2 = []
-        self.light = []
+        # Comparison results for the display panel
+        self.reset_results()
 
         # Scrollbar reset
         self.scroller.re_init()
@@ -137,6 +117,18 @@ class Manager(DataGest):
         Detects if the mouse is over the control panel (right) or the text
         panel (left). Updates button hover states accordingly.
         """
+        if self.worker is not None:
+            # only the Cancel button (and the results being found) are
+            # active during a long phase
+            self.cancel_bt.test_mouse(self.mouse_pos)
+            self.m_text = (self.state in self.live_states) and (
+                self.mouse_pos[0] > self.COMP_TX_X[0])
+
+            if self.m_text:
+                self.scroller.test_mouse(self.mouse_pos)
+
+            return
+
         if self.mouse_pos[0] > self.COMP_TX_X[0]:
             # set the buttons to False
             self.m_text = True
@@ -145,60 +137,161 @@ class Manager(DataGest):
             self.m_text = False
 
         # Check interaction for all buttons in the control area
-        self.pannels_bt.test_mouse(self.mouse_pos)
+        for button in self.active_buttons():
+            button.test_mouse(self.mouse_pos)
+
+    def active_buttons(self) -> list:
+        """
+        Function to get the buttons currently shown and usable.
+
+        Returns
+        -------
+        buttons : list
+            Buttons of the current pannel, or the Cancel button during a
+            long phase.
+
+        """
+        if self.worker is not None:
+            return [self.cancel_bt]
+
+        buttons = [self.pannels_bt]
         if self.pannel == 'DATA':
-            for button in self.data_buttons:
-                button.test_mouse(self.mouse_pos)
+            buttons += self.data_buttons
 
         elif self.pannel == 'SETTINGS':
             if self.algo == 'Perfect':
-                for button in self.matching_bt:
-                    button.test_mouse(self.mouse_pos)
-
+                buttons += self.matching_bt
             elif self.algo == 'Levenshtein':
-                for button in self.levenshtein_bt:
-                    button.test_mouse(self.mouse_pos)
-
+                buttons += self.levenshtein_bt
             elif self.algo == 'DamerauLevenshtein':
-                for button in self.D_levenshtein_bt:
-                    button.test_mouse(self.mouse_pos)
+                buttons += self.D_levenshtein_bt
 
         elif self.pannel == 'EXECUTION':
-            for button in self.execution_bt:
-                button.test_mouse(self.mouse_pos)
+            buttons += self.execution_bt
+
+        return buttons
+
+    def hovered_boxes(self) -> set:
+        """
+        Function to get the boxes of the buttons under the mouse, their
+        border is drawn.
+
+        Returns
+        -------
+        boxes : set
+            Tuples (x, y, width, height).
+
+        """
+        boxes = set()
+        for button in self.active_buttons():
+            if type(button) == Button_keyboard:
+                draw_box = [button.draw_box]
+            else:
+                draw_box = button.draw_box
+
+            for i in np.flatnonzero(button.is_mouse_on):
+                boxes.add(tuple(draw_box[i]))
+
+        return boxes
+
+    def selected_keyboard(self) -> list:
+        """
+        Function to get the selected keyboard buttons (blinking cursor).
+
+        Returns
+        -------
+        list
+            Selected Button_keyboard of the current pannel.
+
+        """
+        return [button for button in self.active_buttons()
+                if (type(button) == Button_keyboard) and button.selected]
 
     def load_db_manager(self) -> None:
         """
         Triggered by the load button. Orchestrates the file duplication 
-        and database loading sequence.
+        and database loading sequence in the worker thread.
+        """
+        self.run_in_worker('LOADING', self.load_task, self.load_done)
+
+    def load_task(self) -> bool:
+        """
+        Worker thread part of the loading: duplication then loading of the
+        database.
+
+        Returns
+        -------
+        bool
+            True if the database was loaded.
+
         """
-        self.state = 'LOADING'
-        self.draw() # Force draw to show loading screen
         self.duplicate_table()
-        if self.state != 'ERROR':
-            self.load_database()
+        if (self.state == 'ERROR') or self.cancel_event.is_set():
+            return False
+
+        return self.load_database()
+
+    def load_done(self, done:bool) -> None:
+        """
+        End of the loading, update the status indicators.
+
+        Parameters
+        ----------
+        done : bool
+            If the database was loaded.
+
+        """
+        if done:
             self.state = 'IDLE'
+            self.load_sq.color = [0, 200, 0]
+            if self.comp_st == 1:
+                # compiled database but a new one was imported
+                self.comp_sq.color = [242, 133, 0]
 
-        self.draw()
+        elif self.state != 'ERROR':
+            # cancelled
+            self.state = 'IDLE'
 
     def compile_database(self) -> None:
         """
-        Processes the raw database into structured papers/authors dictionaries.
-        Sets the compilation status (comp_st) to green (2) upon success.
+        Processes the raw database into the papers/authors columns
+        in the worker thread.
         """
         if self.one_loaded:
-            self.state = 'COMPUTING'
-            self.draw()
-            self.treat_by_paper(self)
-            self.state = 'IDLE'
-            self.comp_st = 2
-            self.comp_sq.color = [0, 200, 0]
+            self.run_in_worker('COMPUTING', self.treat_by_paper,
+                               self.compile_done)
 
         else:
             self.m_text = False
             self.state = 'ERROR'
             self.error_type = 'no database'
 
+    def compile_done(self, done:bool) -> None:
+        """
+        End of the compilation. Sets the compilation status (comp_st) to
+        green (2) upon success, back to red (0) if cancelled.
+
+        Parameters
+        ----------
+        done : bool
+            If the compilation went to its end.
+
+        """
+        self.state = 'IDLE'
+        # the shown results refer to the previous authors
+        self.reset_results()
+        self.tex_y = 0
+        self.scroller.re_init()
+        self.scroller.initialise_scroller(self)
+        if done:
+            self.comp_st = 2
+            self.comp_sq.color = [0, 200, 0]
+
+        else:
+            # a cancelled compilation is emptied by the engine
+            self.comp_st = 0
+            self.comp_sq.color = [200, 0, 0]
+
     def comparaison_bt_error_management(self) -> None:
         """
         Checks for prerequisites before allowing a comparison to run. Sets
@@ -210,12 +303,12 @@ class Manager(DataGest):
             self.state = 'ERROR'
             self.error_type = 'no database'
 
-        if self.one_loaded & (len(self.papers) == 0):
+        if self.one_loaded & (len(self.paper_keys) == 0):
             self.m_text = False
             self.state = 'ERROR'
             self.error_type = 'no compil'
 
-        elif (len(self.papers) > 0)&(self.to_compare == None):
+        elif (len(self.paper_keys) > 0)&(self.to_compare == None):
             self.m_text = False
             self.state = 'ERROR'
             self.error_type = 'no compar'
@@ -230,16 +323,20 @@ class Manager(DataGest):
                 if type(button) == Button_keyboard:
                     button.test_errors(self)
 
-    def compute_show(self) -> None:
+    def compute_show(self, then=None) -> None:
         """
-        Runs the comparison logic and calculates UI parameters for the
-        newly generated result list (scrollbar height, scroll index).
+        Runs the comparison logic in the worker thread, the results are
+        shown as they are found.
+
+        Parameters
+        ----------
+        then : callable, optional
+            Called without arguments once the comparison is done. The
+            default is None.
+
         """
         self.comparaison_bt_error_management()
         if self.one_loaded & (self.state != 'ERROR'):
-            self.state = 'COMPARING'
-            self.m_text = False
-            self.draw()
             if self.algo == 'Levenshtein':
                 for button in self.levenshtein_bt:
                     if type(button) == Button_keyboard:
@@ -250,43 +347,77 @@ class Manager(DataGest):
                     if type(button) == Button_keyboard:
                         self.treshold = float(button.temp)
 
-            self.comparison_matching(self)
-            self.state = 'IDLE'
+            # previous results are cleared before the worker adds new ones
+            self.reset_results()
             self.tex_y = 0 # Reset scroll to top
+            self.scroller.re_init()
             self.scroller.initialise_scroller(self)
+            self.run_in_worker('COMPARING', self.comparison_matching,
+                               lambda done: self.compare_done(done, then))
+
+    def compare_done(self, done:bool, then=None) -> None:
+        """
+        End of the comparison, calculates UI parameters for the complete
+        result list (scrollbar height). A cancelled comparison keeps the
+        matches found so far.
+
+        Parameters
+        ----------
+        done : bool
+            If the comparison went to its end.
+        then : callable, optional
+            Called once the comparison is done, see compute_show. The
+            default is None.
+
+        """
+        self.state = 'IDLE'
+        self.scroller.initialise_scroller(self)
+        if done and (then is not None):
+            then()
 
     def compute_export_show(self) -> None:
         """
         Ensures comparison results exist before triggering the CSV export.
         """
-        if len(self.liste1) > 0:
+        if self.num_rows > 0:
             # Show was already computed
-            pass
+            self.export_show()
         else:
             # Show wasn't already computed
-            self.compute_show()
+            self.compute_show(self.export_show)
 
+    def export_show(self) -> None:
+        """
+        Runs the CSV export of the comparison in the worker thread.
+        """
         if self.one_loaded & (self.state != 'ERROR'):
-            self.state = 'EXPORTING'
-            self.m_text = False
-            self.draw()
-            self.export_comparaison()
-            self.state = 'IDLE'
+            self.run_in_worker('EXPORTING', self.export_comparaison,
+                               self.export_done)
 
     def export_jsonf(self) -> None:
         """
         Handles the export of the database to a JSON format.
         """
-        self.state = 'EXPORTING'
-        self.m_text = False
-        self.draw()
         if not self.one_loaded:
+            self.m_text = False
             self.state = 'ERROR'
             self.error_type = 'no database'
         else:
-            self.export_db2json()
-            if self.state != 'ERROR':
-                self.state = 'IDLE'
+            self.run_in_worker('EXPORTING', self.export_db2json,
+                               self.export_done)
+
+    def export_done(self, result:None) -> None:
+        """
+        End of an export.
+
+        Parameters
+        ----------
+        result : None
+            Result of the export functions.
+
+        """
+        if self.state != 'ERROR':
+            self.state = 'IDLE'
 
     def mouse_gestion_clic(self) -> None:
         """
@@ -297,6 +428,11 @@ class Manager(DataGest):
             self.state = 'IDLE'
             self.error_type = ''
 
+        elif self.worker is not None:
+            self.cancel_bt.actions(self)
+            if self.m_text:
+                self.scroller.click(self)
+
         elif self.state == 'IDLE':
             self.pannels_bt.actions(self)
             if self.m_text:
@@ -359,15 +495,41 @@ class Manager(DataGest):
         """
         # Load Status indicator
         self.load_sq.draw(self.window)
+        if self.one_loaded and (self.load_time is not None):
+            # duration of the last loading, in its indicator
+            self.draw_in_square(self.load_sq, f'{self.load_time:.1f}s')
 
         # Compilation Status indicator
         #     red: not compiled
         #     orange: compiled database but a new one was imported
         #     green: compiled and no new loaded
         self.comp_sq.draw(self.window)
+        peak = self.phase_memory.get('compile')
+        if (self.comp_st == 2) and self.memory_per_phase and (
+                peak is not None):
+            # peak resident memory of the compilation, in its indicator
+            self.draw_in_square(self.comp_sq, f'{peak:.0f}M' if peak < 1000
+                                else f'{peak/1024:.1f}G')
         for button in self.data_buttons:
             button.draw(self.window)
 
+    def draw_in_square(self, square:Inidication, text:str) -> None:
+        """
+        Function to render a short text centred in a status indicator.
+
+        Parameters
+        ----------
+        square : Inidication
+            Status indicator.
+        text : str
+            Text to render.
+
+        """
+        x, y, w, h = square.box
+        tx = TEXT_CACHE.render(text, self.TEXT_FONT)
+        self.window.blit(tx, (x+(w-tx.get_width())/2,
+                              y+(h-tx.get_height())/2))
+
     def draw_settings_pannel(self) -> None:
         """
         Function to render the settings pannel. To define algorithm settingd.
@@ -399,24 +561,27 @@ class Manager(DataGest):
         """
         Function to render the result of the author comparision.
         """
-        if self.state not in self.waiting_messages:
-            c = 0
-            for i in range(self.tex_y, self.tex_y+self.delta_txy):
-                if self.light[i]:
+        if (self.state not in self.waiting_messages) or (
+                self.state in self.live_states):
+            # only the visible lines are built
+            rows = self.result_rows(self.tex_y, self.tex_y+self.delta_txy)
+            for c, (text_1, text_2, light) in enumerate(rows):
+                if light:
                     pygame.draw.rect(self.window, self.bt_color,
                         (self.box_tx[0], c*self.text_height, self.box_tx[2],
                          self.text_height))
 
-                tx = self.TEXT_FONT.render(self.liste1[i], 1, 'black')
+                # the same lines are drawn at each frame
+                tx = TEXT_CACHE.render(self.fit_text(text_1),
+                                       self.TEXT_FONT)
                 self.window.blit(tx, (self.COMP_TX_X[0],
                                       self.COMP_TX_DY+self.text_height*c))
 
-                tx = self.TEXT_FONT.render(self.liste2[i], 1, 'black')
+                tx = TEXT_CACHE.render(self.fit_text(text_2),
+                                       self.TEXT_FONT)
                 self.window.blit(tx, (self.COMP_TX_X[1],
                                       self.COMP_TX_DY+self.text_height*c))
 
-                c += 1
-
         # --- SCROLLBAR AND OTHER AREA ---
         self.scroller.draw(self.window)
 
@@ -486,7 +651,7 @@ class Manager(DataGest):
             The vertical center position for the text.
 
         """
-        tx_f = self.TITLE_FONT.render(text, 1, 'black')
+        tx_f = TEXT_CACHE.render(text, self.TITLE_FONT)
         self.window.blit(tx_f, (600 * self.SCALE-tx_f.get_width()/2,
                                 center_y-tx_f.get_height()/2))
 
@@ -527,24 +692,93 @@ class Manager(DataGest):
             pygame.draw.rect(self.window, 'black', self.prog_box)
             # The text of the progression bar
             self.idx_blit = self.TEXT_FONT.render(str(self.index), 1, 'black')
-            self.idx_pos[0] = 595*self.SCALE-self.idx_blit.get_width()
+            self.idx_pos[0] = (self.pb_text[0]-5*self.SCALE
+                               -self.idx_blit.get_width())
 
             self.window.blit(self.idx_blit, self.idx_pos)
             self.window.blit(self.max_i_blit, self.max_i_pos)
 
-    def draw(self) -> None:
+        if self.worker is not None:
+            self.cancel_bt.draw(self.window)
+
+    def draw_live_progress(self, message:list) -> None:
+        """
+        Renders the progression over the control pannel, while the results
+        are shown in the comparison pannel.
+
+        Parameters
+        ----------
+        message : list
+            Lines of text to display.
+
+        """
+        pygame.draw.rect(self.window, self.bg_color,
+                         (0, 0, self.box_tx[0], self.HEIGHT))
+
+        for i in range(len(message)):
+            tx = TEXT_CACHE.render(message[i], self.TEXT_FONT)
+            self.window.blit(tx, (200*self.SCALE-tx.get_width()/2,
+                                  (120+30*i)*self.SCALE))
+
+        if self.prog_bar:
+            pygame.draw.line(self.window, 'black', self.pb_line[0],
+                             self.pb_line[1], 2)
+
+            pygame.draw.line(self.window, 'black', self.pb_line[2],
+                             self.pb_line[3], 2)
+
+            pygame.draw.rect(self.window, 'black', self.prog_box)
+            self.idx_blit = self.TEXT_FONT.render(str(self.index), 1, 'black')
+            self.idx_pos[0] = (self.pb_text[0]-5*self.SCALE
+                               -self.idx_blit.get_width())
+
+            self.window.blit(self.idx_blit, self.idx_pos)
+            self.window.blit(self.max_i_blit, self.max_i_pos)
+
+        self.cancel_bt.draw(self.window)
+
+    def draw(self, rects:list=None) -> None:
         """
         Primary draw loop. Handles clearing the screen and deciding
         which overlay (Error, Waiting, or Main UI) to render.
+
+        Parameters
+        ----------
+        rects : list, optional
+            Parts of the window to redraw, the drawing is clipped to them.
+            The default is None (whole window).
+
         """
+        if rects is not None:
+            self.window.set_clip(pygame.Rect(rects[0]).unionall(rects[1:]))
+
         self.window.fill(self.bg_color)
         self.draw_main_interface()
         if self.state == 'ERROR':
             self.draw_error()
+        elif self.state in self.live_states:
+            self.draw_live_progress(self.live_states[self.state])
         elif self.state in self.waiting_messages:
             self.draw_waiting_screen(self.waiting_messages[self.state])
 
-        pygame.display.update()
+        if rects is None:
+            pygame.display.update()
+        else:
+            self.window.set_clip(None)
+            pygame.display.update(rects)
+
+    def draw_dirty(self) -> None:
+        """
+        Function to redraw only what changed since the last frame (see
+        mark_dirty).
+        """
+        if self.full_redraw:
+            self.draw()
+        elif len(self.dirty_rects) > 0:
+            self.draw(self.dirty_rects)
+
+        self.full_redraw = False
+        self.dirty_rects = []
 
     def main(self) -> None:
         """
@@ -552,15 +786,32 @@ class Manager(DataGest):
         """
         clock = pygame.time.Clock()
         self.run = True
+        self.mark_dirty()
         while self.run:
-            clock.tick(self.FPS)
+            cursors = self.selected_keyboard()
+            if (self.worker is not None) or (len(cursors) > 0):
+                # progression or blinking cursor: one frame per tick
+                clock.tick(self.FPS)
+                events = pygame.event.get()
+                for button in cursors:
+                    self.mark_dirty(button.draw_box)
+
+            else:
+                # nothing changes until an event comes
+                events = [pygame.event.wait(self.IDLE_WAIT)]
+                events += pygame.event.get()
+
             self.mouse_pos = pygame.mouse.get_pos()
 
             # Update hover states only if no error is blocking the UI
             if self.state != 'ERROR':
+                hovered = self.hovered_boxes()
                 self.mouse_over_params()
+                # borders to draw or erase
+                for box in hovered ^ self.hovered_boxes():
+                    self.mark_dirty(box)
     
-            for event in pygame.event.get():
+            for event in events:
                 # Click handling (ignoring wheel as click)
                 if event.type == pygame.QUIT:
                     self.run = False
@@ -570,15 +821,26 @@ class Manager(DataGest):
                 if (event.type == pygame.MOUSEBUTTONDOWN)&(
                     event.type != pygame.MOUSEWHEEL):
                     self.mouse_gestion_clic()
+                    self.mark_dirty()
     
-                if event.type == pygame.MOUSEWHEEL:
+                if (event.type == pygame.MOUSEWHEEL) and (
+                        (self.worker is None) or (
+                        self.state in self.live_states)):
                     self.scroller.mouse_wheel(event, self)
+                    self.mark_dirty(self.box_tx)
 
                 if event.type == pygame.KEYDOWN:
                     self.gestion_keyboard(event)
+                    self.mark_dirty()
+
+                if event.type in [pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE]:
+                    self.mark_dirty()
     
-            self.draw()
+            # progression and end of the phase running in the worker
+            self.drain_worker()
+            self.draw_dirty()
     
+        self.stop_worker()
         pygame.quit()
 
 if __name__ == '__main__':
@@ -0,0 +1,186 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context, shared_memory
+
+# For string distances
+import distances
+
+# Arrays shared with the worker processes, attached once per worker
+_shared = {}
+
+def share_arrays(arrays:dict) -> (list, dict):
+    """
+    Function to copy arrays into shared memory blocks.
+
+    Parameters
+    ----------
+    arrays : dict
+        NumPy arrays to share, by name.
+
+    Returns
+    -------
+    blocks : list
+        Shared memory blocks, to close and unlink once the work is done.
+    specs : dict
+        For each array name: (block name, shape, dtype) to attach it.
+
+    """
+    blocks = [] ; specs = {}
+    for key, arr in arrays.items():
+        # a block can not be empty
+        block = shared_memory.SharedMemory(create=True,
+                                           size=max(arr.nbytes, 1))
+
+        view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=block.buf)
+        view[...] = arr
+        blocks.append(block)
+        specs[key] = (block.name, arr.shape, arr.dtype.str)
+
+    return blocks, specs
+
+def init_worker(specs:dict) -> None:
+    """
+    Initializer of the worker processes: attach the shared arrays. Each
+    worker uses one thread, the parallelism is given by the processes.
+
+    Parameters
+    ----------
+    specs : dict
+        For each array name: (block name, shape, dtype), see share_arrays.
+
+    """
+    import numba
+    numba.set_num_threads(1)
+    for key, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        _shared[key] = (block, np.ndarray(shape, dtype=dtype,
+                                          buffer=block.buf))
+
+def compute_matches(arrays:dict, start:int, stop:int, params:dict
+                    ) -> np.ndarray:
+    """
+    Function to test the candidate pairs start to stop with the batched
+    distance kernels.
+
+    Parameters
+    ----------
+    arrays : dict
+        Names buffers ('codes_1', 'offsets_1' and for both names
+        'codes_2', 'offsets_2') and candidates ('idx_1', 'idx_2').
+    start : int
+        First candidate.
+    stop : int
+        Last candidate (excluded).
+    params : dict
+        'treshold', 'damerau', 'mode' (None for one name, else both name
+        code) and 'chunk' (pairs per parallel chunk of the kernels).
+
+    Returns
+    -------
+    np.ndarray
+        Distance of each candidate pair (1.0 when over the treshold).
+
+    """
+    idx_1 = arrays['idx_1'][start:stop]
+    idx_2 = arrays['idx_2'][start:stop]
+    if params['mode'] is None:
+        dist = distances.Batch_distances(
+            arrays['codes_1'], arrays['offsets_1'], idx_1, idx_2,
+            params['treshold'], params['damerau'], params['chunk'])
+    else:
+        dist = distances.Batch_both_name_distances(
+            arrays['codes_1'], arrays['offsets_1'], arrays['codes_2'],
+            arrays['offsets_2'], idx_1, idx_2, params['treshold'],
+            params['mode'], params['damerau'], params['chunk'])
+
+    return dist
+
+def match_shard(start:int, stop:int, params:dict) -> (int, np.ndarray):
+    """
+    Task of a worker process: test a shard of the candidate pairs on the
+    shared arrays.
+
+    Parameters
+    ----------
+    start : int
+        First candidate of the shard.
+    stop : int
+        Last candidate of the shard (excluded).
+    params : dict
+        See compute_matches.
+
+    Returns
+    -------
+    start : int
+        First candidate of the shard, to merge the results in order.
+    np.ndarray
+        Distance of each candidate pair of the shard.
+
+    """
+    arrays = {key: view for key, (_, view) in _shared.items()}
+    return start, compute_matches(arrays, start, stop, params)
+
+def iter_matches(arrays:dict, params:dict, shards:int, chunk_size:int):
+    """
+    Generator testing all the candidate pairs, split in shards of
+    chunk_size pairs. With more than one shard process, the shards run in a
+    process pool sharing the names buffers, else they run one after the
+    other in this process. The shards are given back in the candidates
+    order as soon as they (and the previous ones) are done. Closing the
+    generator cancels the remaining shards.
+
+    Parameters
+    ----------
+    arrays : dict
+        See compute_matches.
+    params : dict
+        See compute_matches.
+    shards : int
+        Number of worker processes (1 to stay in this process).
+    chunk_size : int
+        Number of candidate pairs per shard.
+
+    Yields
+    ------
+    start : int
+        First candidate of the shard.
+    stop : int
+        Last candidate of the shard (excluded).
+    dists : np.ndarray
+        Distance of each candidate pair of the shard.
+
+    """
+    num = len(arrays['idx_1'])
+    bounds = [(st, min(st+chunk_size, num)) for st in range(0, num,
+                                                           chunk_size)]
+    if (shards <= 1) or (len(bounds) <= 1):
+        for start, stop in bounds:
+            yield start, stop, compute_matches(arrays, start, stop, params)
+
+        return
+
+    blocks, specs = share_arrays(arrays)
+    # new interpreters (as on Windows): forking would copy the numba
+    # threads of this process
+    executor = ProcessPoolExecutor(max_workers=shards,
+                                   mp_context=get_context('spawn'),
+                                   initializer=init_worker, initargs=(specs,))
+    try:
+        futures = [executor.submit(match_shard, start, stop, params)
+                   for start, stop in bounds]
+
+        # shards done before the previous ones wait here
+        pending = {} ; next_start = 0
+        for future in as_completed(futures):
+            start, result = future.result()
+            pending[start] = result
+            while next_start in pending:
+                result = pending.pop(next_start)
+                yield next_start, next_start+len(result), result
+                next_start += len(result)
+
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        for block in blocks:
+            block.close()
+            block.unlink()
@@ -0,0 +1,49 @@
+import sys
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from benchmark import make_library
+from engine import Engine
+
+@pytest.fixture
+def engine(tmp_path):
+    """
+    Engine without ini file, with nothing loaded.
+    """
+    return Engine(config_path=tmp_path / 'none.ini')
+
+@pytest.fixture
+def compiled(tmp_path):
+    """
+    Function building a synthetic library whose authors are the given
+    (last name, first name) pairs, one document each, and returning the
+    engine that loaded and compiled it.
+    """
+    def build(names:list, low_memory:bool=False) -> Engine:
+        path = tmp_path / 'library'
+        make_library(path, len(names))
+        zotero = sqlite3.connect(path / 'zotero.sqlite')
+        zotero.execute("DELETE FROM creators")
+        zotero.execute("DELETE FROM itemCreators")
+        zotero.executemany("INSERT INTO creators VALUES (?, ?, ?)",
+                           [(c+1, first, last) for c, (last, first)
+                            in enumerate(names)])
+
+        zotero.executemany("INSERT INTO itemCreators VALUES (?, ?, ?)",
+                           [(2*c+1, c+1, 0) for c in range(len(names))])
+
+        zotero.commit()
+        zotero.close()
+
+        engine = Engine(config_path=tmp_path / 'none.ini')
+        engine.to_path = path
+        engine.low_memory = low_memory
+        engine.load_database()
+        assert engine.treat_by_paper()
+        return engine
+
+    return build
@@ -0,0 +1,38 @@
+import pytest
+
+import distances
+
+def compatible(engine, first_1:str, first_2:str) -> bool:
+    return distances.Initials_compatible(*engine.tokenize_first_name(first_1),
+                                         *engine.tokenize_first_name(first_2))
+
+@pytest.mark.parametrize('first_1, first_2, expected', [
+    ('R. S. J.', 'Robert Stephen John', True),
+    # missing middle names are accepted
+    ('R. S.', 'Robert Stephen John', True),
+    ('R. J.', 'Robert Stephen John', True),
+    ('R.', 'R. S.', True),
+    ('J.-L.', 'Jean-Luc', True),
+    # the first tokens must be compatible
+    ('S. J.', 'Robert Stephen John', False),
+    ('J.', 'Robert', False),
+    # full tokens must be equal
+    ('Rob', 'Robert', False),
+    ('Robert', 'Roberta', False)])
+def test_initials_compatible(engine, first_1, first_2, expected):
+    assert compatible(engine, first_1, first_2) == expected
+    assert compatible(engine, first_2, first_1) == expected
+
+def test_one_abbreviated_author_is_enough(compiled):
+    engine = compiled([('Smith', 'R. S. J.'), ('Smith', 'Robert Stephen'),
+                       ('Smith', 'Stephen'), ('Smith', 'Robert'),
+                       ('Smith', 'Roberto'), ('Dupont', 'R.')])
+
+    engine.algo = 'Levenshtein' ; engine.to_compare = 'bothname'
+    engine.filter_abv[0] = True ; engine.treshold = 0.1
+    matches = {tuple(map(str, keys)) for keys in engine.iter_matching()}
+    # the pairs of full first names are not compared, the abbreviated one
+    # is compared to the full first names it can stand for
+    assert matches == {('Smith, R. S. J.', 'Smith, Robert'),
+                       ('Smith, R. S. J.', 'Smith, Robert Stephen'),
+                       ('Smith, R. S. J.', 'Smith, Roberto')}
@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+from benchmark import LAST_NAMES, FIRST_NAMES
+
+NAMES = [(last, first) for last in LAST_NAMES[:8] for first in FIRST_NAMES]
+
+def test_low_memory_chunks_give_the_same_compilation(compiled):
+    engine = compiled(NAMES)
+    expected = (engine.auth_keys, engine.paper_keys, engine.paper_title)
+    engine.low_memory = True ; engine.read_chunk = 7
+    engine.load_database()
+    creators = engine.data['creators']
+    assert creators['creatorID'].dtype == np.int32
+    assert isinstance(creators['lastName'].dtype, pd.CategoricalDtype)
+    assert engine.treat_by_paper()
+    for before, after in zip(expected, (engine.auth_keys, engine.paper_keys,
+                                        engine.paper_title)):
+        assert list(before) == list(after)
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import distances
+from benchmark import FIRST_NAMES, LAST_NAMES, name_variant
+
+# without the special characters, 'Müller' and 'Muller' are the same name
+NAMES = [('Müller', 'Anna'), ('Muller', 'Anna'), ('Muller', 'Robert'),
+         ('Dupont', 'Anna'), ('Dupont', 'Ánna')]
+
+@pytest.mark.parametrize('both, expected', [
+    ('AND', [(0, 1), (3, 4)]),
+    ('AVG', [(0, 1), (3, 4)]),
+    ('OR', [(0, 1), (0, 2), (1, 2), (3, 4), (0, 3), (0, 4), (1, 3),
+            (1, 4)])])
+def test_perfect_both_names(compiled, both, expected):
+    engine = compiled(NAMES)
+    engine.algo = 'Perfect' ; engine.to_compare = 'bothname'
+    engine.both_comp = both
+    matches = {tuple(sorted(map(str, keys)))
+               for keys in engine.iter_matching()}
+
+    key = lambda a: ', '.join(NAMES[a])
+    assert matches == {tuple(sorted((key(a), key(b)))) for a, b in expected}
+
+# 2*0.6-1.0 = 0.19999999999999996 is the budget left to the first names,
+# the pair sits exactly on the treshold: (1.0+1/5)/2 = 0.6
+BOUNDARY = [('Abc', 'Bjorx'), ('Xyz', 'Bjor')]
+
+@pytest.mark.parametrize('damerau', [False, True])
+def test_average_boundary_kernel(damerau):
+    code = lambda s: np.array([ord(c) for c in s], dtype=np.uint32)
+    work = np.zeros((3, 8), dtype=np.int32)
+    dist = distances.Both_name_distance(code('abc'), code('xyz'),
+                                        code('bjorx'), code('bjor'), 0.6, 2,
+                                        damerau, work)
+    assert dist == pytest.approx(0.6)
+
+@pytest.mark.parametrize('algo', ['Levenshtein', 'DamerauLevenshtein'])
+def test_average_boundary(compiled, algo):
+    engine = compiled(BOUNDARY)
+    engine.algo = algo ; engine.to_compare = 'bothname'
+    engine.both_comp = 'AVG' ; engine.treshold = 0.6
+    assert len(list(engine.iter_matching())) == 1
+
+def variant_names(num:int, seed:int=0) -> list:
+    rng = np.random.default_rng(seed)
+    names = set()
+    while len(names) < num:
+        last = LAST_NAMES[int(rng.integers(0, len(LAST_NAMES)))]
+        first = FIRST_NAMES[int(rng.integers(0, len(FIRST_NAMES)))]
+        names.add((name_variant(last, rng), name_variant(first, rng)))
+
+    return sorted(names)
+
+@pytest.mark.parametrize('algo', ['Levenshtein', 'DamerauLevenshtein'])
+@pytest.mark.parametrize('compare, both', [
+    ('lastname', 'AND'), ('firstname', 'AND'), ('bothname', 'AND'),
+    ('bothname', 'OR'), ('bothname', 'AVG')])
+def test_brute_force(compiled, algo, compare, both):
+    engine = compiled(variant_names(80))
+    distance = (distances.Levenshtein_distance if algo == 'Levenshtein'
+                else distances.Damerau_Levenshtein_distance)
+    combine = {'AND':max, 'OR':min, 'AVG':lambda d_l, d_f: (d_l+d_f)/2}[both]
+    authors = [engine.author(a) for a in range(len(engine.auth_keys))]
+    engine.algo = algo ; engine.to_compare = compare ; engine.both_comp = both
+    for treshold in np.arange(2, 9)/10:
+        engine.treshold = treshold
+        matches = {tuple(sorted(keys)) for keys in engine.iter_matching()}
+
+        expected = {}
+        for a, author_1 in enumerate(authors):
+            for author_2 in authors[a+1:]:
+                d_l = distance(author_1['l_Name_uc_r'],
+                               author_2['l_Name_uc_r'])
+                d_f = distance(author_1['f_Name_uc_r'],
+                               author_2['f_Name_uc_r'])
+                dist = {'lastname':d_l, 'firstname':d_f}.get(
+                    compare, combine(d_l, d_f))
+                if dist <= treshold:
+                    expected[tuple(sorted((author_1.key,
+                                           author_2.key)))] = dist
+
+        assert matches == set(expected), treshold
+        # the recorded distances are the compared ones
+        keys = engine.auth_keys
+        for i, j, dist in zip(engine.match_i, engine.match_j,
+                              engine.match_dist):
+            pair = tuple(sorted((keys[i], keys[j])))
+            assert dist == pytest.approx(expected[pair], abs=1e-6)
+
+def test_export_distance_group(compiled):
+    engine = compiled([('Smith', 'Anna'), ('Smyth', 'Anna'),
+                       ('Smith', 'Anne'), ('Dupont', 'Jean'),
+                       ('Dupond', 'Jean')])
+    engine.algo = 'Levenshtein' ; engine.to_compare = 'bothname'
+    engine.both_comp = 'AND' ; engine.treshold = 0.25
+    matches = list(engine.iter_matching())
+    engine.export_comparaison()
+
+    csv = pd.read_csv(engine.to_path / 'exported_comparison.csv')
+    first = csv.dropna(subset=['distance'])
+    assert len(csv) == 2*len(matches) and len(first) == len(matches)
+    groups = {frozenset(pair): group for pair, group
+              in zip(matches, first['group'])}
+
+    # numbered in the order of their first match
+    assert sorted(groups.values()) == [0, 1, 1, 1]
+    assert len({groups[frozenset(('Smith, Anna', 'Smyth, Anna'))],
+                groups[frozenset(('Smith, Anna', 'Smith, Anne'))],
+                groups[frozenset(('Smyth, Anna', 'Smith, Anne'))]}) == 1
+    assert sorted(first['distance']) == [0.167, 0.2, 0.25, 0.25]
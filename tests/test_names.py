@@ -0,0 +1,19 @@
+def test_only_first_names_are_tokenized(engine):
+    assert engine.normalize_name('Müller')[3:] == (None, None)
+    forms = engine.normalize_name('Müller', True)
+    assert forms[:3] == ('Muller', 'Müller', 'Muller')
+    assert list(forms[4][0]) == [ord(c) for c in 'muller']
+
+def test_memo_drops_the_least_recently_used(engine):
+    engine.memo_size = 2
+    engine.normalize_name('Smith')
+    engine.normalize_name('Dupont')
+    engine.normalize_name('Smith')
+    engine.normalize_name('Martin')
+    assert list(engine.name_memo) == ['Smith', 'Martin']
+
+def test_names_of_the_same_library_survive_recompilations(compiled):
+    engine = compiled([('Smith', 'Robert'), ('Dupont', 'Anna')])
+    memo = dict(engine.name_memo)
+    assert engine.treat_by_paper()
+    assert all(engine.name_memo[name] is memo[name] for name in memo)
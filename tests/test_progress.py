@@ -0,0 +1,61 @@
+import pytest
+
+NAMES = [('Smith', 'Robert'), ('Smyth', 'Robert'), ('Dupont', 'Anna')]
+
+def cancel_at(call:int):
+    """
+    Progression callback cancelling the phase at its call number `call`.
+    """
+    calls = []
+    def progress(index:int, total:int) -> bool:
+        calls.append(index)
+        return len(calls) > call
+
+    return progress
+
+@pytest.mark.parametrize('low_memory', [False, True])
+def test_cancelled_compilation_is_emptied(compiled, low_memory):
+    engine = compiled(NAMES, low_memory)
+    calls = []
+    engine.progress = lambda index, total: calls.append(index)
+    assert engine.treat_by_paper()
+    # every step of the compilation can be cancelled
+    for call in range(len(calls)):
+        if low_memory:
+            # read again by each compilation
+            engine.release_tables()
+
+        engine.progress = cancel_at(call)
+        assert not engine.treat_by_paper()
+        assert len(engine.auth_keys) == 0
+        assert len(engine.paper_keys) == 0
+
+def test_cancelled_loading_keeps_the_previous_database(compiled):
+    engine = compiled(NAMES)
+    data = engine.data
+    for call in range(3):
+        engine.progress = cancel_at(call)
+        assert not engine.load_database()
+        assert engine.data is data
+
+    engine.progress = None
+    assert engine.load_database()
+    assert engine.data is not data
+
+@pytest.mark.parametrize('low_memory', [False, True])
+def test_loading_cancelled_while_reading(compiled, low_memory):
+    engine = compiled(NAMES)
+    data = engine.data
+    engine.low_memory = low_memory ; engine.read_chunk = 1
+    # every check reports
+    engine.refresh_rate = 0
+    calls = []
+    engine.progress = lambda index, total: calls.append(index)
+    assert engine.load_database()
+    # checked between the tables or chunks, not only between the steps
+    assert len(calls) > 3
+
+    engine.data = data
+    engine.progress = cancel_at(1)
+    assert not engine.load_database()
+    assert engine.data is data